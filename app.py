@@ -1,21 +1,37 @@
 import asyncio
+import collections
 import datetime
-from typing import Dict, Any, Optional
+import functools
+import hashlib
+import logging
+import os
+import re
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator, Optional
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Body
+import orjson
+
+# Set up before the tool modules are imported, since some log at import time
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(),
+                    format="%(levelname)s:%(name)s: %(message)s")
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, ConfigDict, Field
 
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from trip_agent import create_trip_agent
-from db.mongo import upsert_user_location, get_user_location
+from db import mongo
+from tools.cache import TTLCache
+from tools.session import close_session, stop_tool_loop
+from db.mongo import ensure_indexes, upsert_user_location, get_user_location
 
 # Updated import path for SOS system
 try:
     from tools.sos import SOSSystem
-    from tools.sos import add_single_contact
+    from tools.sos import add_single_contact, list_contacts
 except ImportError as e:
     print(f"Warning: SOS system import failed: {e}")
     class SOSSystem:
@@ -23,16 +39,33 @@ except ImportError as e:
             return "SOS system not available"
     async def add_single_contact(*args, **kwargs):
         return "Contact system not available"
+    async def list_contacts(*args, **kwargs):
+        return "Contact system not available"
 
 import uvicorn
 import sys
 
+# ----------------------------
+# Intent keywords
+# ----------------------------
+SOS_WORDS = frozenset({"sos", "emergency", "urgent"})
+PLAN_WORDS = frozenset({"plan", "plans", "planning", "trip", "trips", "days", "itinerary"})
+INFO_WORDS = frozenset({"weather", "places", "directions", "budget"})
+SOS_PHRASE_RE = re.compile(r"\bhelp me\b")
+SOS_SETUP_RE = re.compile(r"add contact|setup")
+WORD_RE = re.compile(r"\w+")
+LINK_RE = re.compile(r"\[(See Here|View Here|Check Photo)\]")
+LINK_SUB = r"[🔗 \1]"
+
+def tokenize(text: str) -> frozenset:
+    """Lowercase word set used for keyword intent checks."""
+    return frozenset(WORD_RE.findall(text.lower()))
+
 # ----------------------------
 # Helpers / greeting
 # ----------------------------
-def get_greeting():
-    """Get time-based personalized greeting."""
-    hour = datetime.datetime.now().hour
+@functools.lru_cache(maxsize=24)
+def _greeting_for_hour(hour: int) -> str:
     if hour < 12:
         return "Good morning! Ready to explore India today?"
     elif hour < 17:
@@ -40,16 +73,55 @@ def get_greeting():
     else:
         return "Good evening! Let's plan your next adventure!"
 
+def get_greeting():
+    """Get time-based personalized greeting."""
+    return _greeting_for_hour(datetime.datetime.now().hour)
+
+# ----------------------------
+# Chat message templates
+# ----------------------------
+WELCOME_TEMPLATE = "🎯 **Welcome to Your AI Travel Guide!**\n\n{greeting}\n\n**I specialize in:**\n• 🗺️ **Step-by-step trip planning** (considering meal times & energy levels)\n• 🌤️ **Real-time weather** for perfect timing\n• 🏞️ **Safe attractions** (family-friendly waterfalls first!)\n• 🏨 **Smart accommodation** suggestions\n• 🍛 **Local food** recommendations\n\n**Psychology-aware planning:** I understand when you need breaks, meals, and rest!\n\n**Ready to plan your perfect journey?** Try: 'Plan a 2-day trip to Ooty' or ask about any destination!"
+EMPTY_INPUT_MSG = "🎯 **I'm here to help with your travel needs!**\n\n**Try asking:**\n• 'Plan a weekend trip to Goa'\n• 'Weather in Manali tomorrow'\n• 'Best places in Kerala'\n• 'Hotels in Ooty'\n\n**What's your travel question?**"
+SOS_SETUP_MSG = "To setup emergency contacts, please use the 'Setup SOS' button in the interface above. This will allow you to add emergency contacts for future SOS alerts."
+SOS_BUTTON_MSG = "For immediate emergency assistance, use the red SOS button (🆘) in the input area. This will instantly send alerts to your saved emergency contacts. If you haven't set up contacts yet, use the 'Setup SOS' button first."
+PLAN_FALLBACK_MSG = "🎯 **Let's Plan Your Perfect Trip!**\n\nI'm analyzing your request for {query}. \n\n**Step-by-Step Planning:**\n• First, I'll suggest morning activities (8-11 AM)\n• Then breakfast spots with local specialties\n• Followed by afternoon attractions\n• Evening relaxation and dinner options\n\n✅ **Ready to create your personalized itinerary!**"
+GENERIC_FALLBACK_MSG = "🎯 **Processing Your Travel Query**\n\nI'm gathering information about {query}.\n\n**Quick Tips:**\n• For weather: 'Weather in [city]'\n• For places: 'Best places in [destination]'\n• For planning: 'Plan 3-day trip to [location]'\n\n✅ **Ready to help with your travel needs!**"
+NO_RESULT_MSG = "🎯 **Step 1 of 2: Query Processing**\n\nI understand you're asking about travel. Let me help!\n\n**Step 2 of 2: How to Get Best Results**\n• Be specific about destinations\n• Mention what you need (weather, places, hotels)\n• Ask about trip planning for detailed itineraries\n\n✅ **Ready to assist with your travel needs!**"
+ERROR_FALLBACK_MSG = "🎯 **Step 1 of 2: Processing Your Travel Query**\n\nI'm here to help with your travel planning! \n\n**Step 2 of 2: Let's Get Started**\nTry asking about:\n• Weather: 'What's the weather in Mumbai?'\n• Places: 'Best places to visit in Goa'\n• Planning: 'Plan a 3-day trip to Kerala'\n\n✅ **Ready to create your perfect travel experience!**"
+
 # ----------------------------
 # FastAPI app + CORS
 # ----------------------------
-app = FastAPI(title="AI Travel Guide - Conversational")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.mongo = mongo.connect()
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        print(f"Warning: could not create MongoDB indexes: {e}")
+    yield
+    await close_session()
+    await asyncio.to_thread(stop_tool_loop)
+    mongo.close()
+
+app = FastAPI(
+    title="AI Travel Guide - Conversational",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+# Comma-separated list of origins allowed to call the API cross-site
+FRONTEND_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("FRONTEND_ORIGIN", "http://localhost:7860").split(",")
+    if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=FRONTEND_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type"],
+    max_age=86400,
 )
 
 # Serve static files (frontend)
@@ -58,18 +130,154 @@ app.mount("/static", StaticFiles(directory="frontend"), name="static")
 # ----------------------------
 # Session state and graph
 # ----------------------------
-SESSIONS: Dict[str, Dict[str, Any]] = {}
+# Bounded LRU of per-user conversation state; the oldest idle users are evicted
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "1000"))
+# User/assistant messages kept per session; older context lives on in the slots
+MAX_HISTORY_MESSAGES = int(os.getenv("MAX_HISTORY_MESSAGES", "6"))
+
+SESSIONS: "collections.OrderedDict[str, Dict[str, Any]]" = collections.OrderedDict()
 GRAPH = create_trip_agent()
 
+def get_session(user_id: str) -> Dict[str, Any]:
+    """Return the user's session, creating it and evicting the LRU entry as needed."""
+    session = SESSIONS.get(user_id)
+    if session is None:
+        session = SESSIONS[user_id] = {
+            "messages": collections.deque(maxlen=MAX_HISTORY_MESSAGES),
+            "slots": {},
+        }
+        while len(SESSIONS) > MAX_SESSIONS:
+            SESSIONS.popitem(last=False)
+    else:
+        SESSIONS.move_to_end(user_id)
+    return session
+
+# Trip details picked up from the agent's tool calls
+ROUTE_RE = re.compile(r"^\s*(.+?)\s+to\s+(.+?)\s*$", re.IGNORECASE)
+
+def update_slots(slots: Dict[str, Any], messages: list) -> None:
+    """Merge trip details from the tool calls in ``messages`` into ``slots``."""
+    called = []
+    for msg in messages:
+        for call in getattr(msg, "tool_calls", None) or ():
+            name, args = call.get("name"), call.get("args") or {}
+            called.append(name)
+            if name == "MapsTool":
+                route = ROUTE_RE.match(str(args.get("query", "")))
+                if route:
+                    slots["origin"], slots["destination"] = route.group(1), route.group(2)
+                continue
+            place = args.get("destination") or args.get("location")
+            if place:
+                slots["destination"] = place
+            if args.get("days"):
+                slots["days"] = args["days"]
+            if args.get("traveler_type"):
+                slots["budget"] = args["traveler_type"]
+    if called:
+        slots["last_tool_calls"] = ", ".join(dict.fromkeys(called))
+
+def build_state(session: Dict[str, Any], user_text: str) -> Dict[str, Any]:
+    """Graph input: known trip slots, the recent exchange, and the new message."""
+    messages = list(session["messages"])
+    slots = session["slots"]
+    if slots:
+        known = "; ".join(f"{key}: {value}" for key, value in slots.items())
+        messages.insert(0, SystemMessage(content=f"Known trip details so far - {known}"))
+    messages.append(HumanMessage(content=user_text))
+    return {"messages": messages}
+
+def finish_turn(session: Dict[str, Any], state: Dict[str, Any],
+                result: Dict[str, Any], user_text: str) -> Optional[str]:
+    """Record the turn in the session and return the assistant's reply, if any."""
+    new_messages = (result.get("messages") or [])[len(state["messages"]):]
+    update_slots(session["slots"], new_messages)
+    reply = _latest_ai_text(new_messages)
+    session["messages"].append(HumanMessage(content=user_text))
+    if reply:
+        session["messages"].append(AIMessage(content=reply))
+    return reply
+
+# Replies to self-contained questions are reused across users for a while
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "1800"))
+ANSWER_CACHE = TTLCache(maxsize=5000, ttl=ANSWER_CACHE_TTL)
+# Words that tie an answer to the current time, place or conversation
+UNCACHEABLE_WORDS = frozenset({
+    "today", "tomorrow", "tonight", "now", "current", "near", "nearby",
+    "yes", "no", "ok", "it", "this", "that", "there", "here",
+    "same", "again", "next", "more", "another",
+})
+
+# Replies built from these tools (or, for trip planning, from live news) go stale
+LIVE_DATA_TOOLS = frozenset({"WeatherTool", "NewsTool"})
+LIVE_DATA_WORDS = frozenset({"weather", "forecast", "news", "budget"}) | PLAN_WORDS
+
+def answer_cache_key(session: Dict[str, Any], user_text: str, tokens: frozenset) -> Optional[str]:
+    """Normalized cache key for a reusable question, or None if it must go to the agent.
+
+    Only a session's first, context-free question is shared: once it has slots
+    or history, the graph's answer depends on them.
+    """
+    if session["slots"] or session["messages"]:
+        return None
+    if user_text.startswith("[LIVE_LOCATION]") or tokens & (SOS_WORDS | UNCACHEABLE_WORDS | LIVE_DATA_WORDS):
+        return None
+    words = WORD_RE.findall(user_text.lower())
+    if len(words) < 3 or SOS_PHRASE_RE.search(" ".join(words)):
+        return None
+    return " ".join(words)
+
+def used_live_data(messages: list) -> bool:
+    """Whether any of ``messages`` called a live-data tool."""
+    return any(
+        call.get("name") in LIVE_DATA_TOOLS
+        for msg in messages
+        for call in getattr(msg, "tool_calls", None) or ()
+    )
+
+# The graph is async end to end (LLM, tools, geocoding), so it runs directly
+# on the server's event loop alongside every other socket.
+async def run_graph(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Invoke the agent graph."""
+    return await GRAPH.ainvoke(state)
+
+async def stream_graph(state: Dict[str, Any]) -> AsyncIterator[tuple]:
+    """Yield ("values", state) after each step and ("messages", (chunk, metadata))
+    for each LLM token."""
+    async for item in GRAPH.astream(state, stream_mode=["values", "messages"]):
+        yield item
+
+def _latest_ai_text(messages: list) -> Optional[str]:
+    """Content of the newest AI message that is a final answer, not a tool call."""
+    for msg in reversed(messages):
+        if getattr(msg, "type", None) != "ai" or getattr(msg, "tool_calls", None):
+            continue
+        content = msg.content
+        if content and isinstance(content, str):
+            return content.strip()
+    return None
+
+def describe_tool_calls(message: Any) -> Optional[str]:
+    """Progress note for a step that is about to call tools."""
+    tool_calls = getattr(message, "tool_calls", None)
+    if not tool_calls:
+        return None
+    names = dict.fromkeys(call["name"].removesuffix("Tool") for call in tool_calls)
+    return f"🔍 **Fetching live data:** {', '.join(names)}..."
+
 # ----------------------------
 # Models
 # ----------------------------
 class LocationIn(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     lat: float = Field(..., description="Latitude")
     lon: float = Field(..., description="Longitude")
     city_hint: Optional[str] = Field(None, description="Optional free-text city")
 
 class ContactIn(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     name: str
     number: str
     relation: str
@@ -77,15 +285,31 @@ class ContactIn(BaseModel):
 # ----------------------------
 # Frontend route
 # ----------------------------
+# Pages are read once at startup; browsers revalidate with If-None-Match
+def load_page(path: str) -> tuple:
+    with open(path, "rb") as f:
+        body = f.read()
+    return body, f'"{hashlib.md5(body).hexdigest()}"'
+
+HOME_PAGE = load_page("frontend/tripset-full.html")
+CLASSIC_PAGE = load_page("frontend/index.html")
+
+def page_response(request: Request, page: tuple) -> Response:
+    body, etag = page
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=300"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="text/html", headers=headers)
+
 @app.get("/")
-async def serve_home():
+async def serve_home(request: Request):
     """Serve the complete Tripset-style website."""
-    return FileResponse("frontend/tripset-full.html")
+    return page_response(request, HOME_PAGE)
 
 @app.get("/classic")
-async def serve_bot_interface():
+async def serve_bot_interface(request: Request):
     """Serve the bot chat interface."""
-    return FileResponse("frontend/index.html")
+    return page_response(request, CLASSIC_PAGE)
 
 
 
@@ -174,7 +398,7 @@ async def add_contact(user_id: str, contact: ContactIn):
     """Add emergency contact."""
     try:
         print(f"Adding contact for user {user_id}: {contact.name}")
-        result = await add_single_contact(user_id, contact.dict())
+        result = await add_single_contact(user_id, contact.model_dump())
         print(f"Contact add result: {result}")
         return {"status": "success", "message": result}
     except Exception as e:
@@ -185,7 +409,6 @@ async def add_contact(user_id: str, contact: ContactIn):
 async def get_contacts(user_id: str):
     """Get all emergency contacts for user."""
     try:
-        from tools.sos import list_contacts
         result = await list_contacts(user_id)
         return {"status": "success", "message": result}
     except Exception as e:
@@ -206,17 +429,53 @@ async def get_place_images(place: str):
 # ----------------------------
 # WebSocket chat - IMPROVED
 # ----------------------------
+class Delta(str):
+    """A piece of the reply still being generated, shown provisionally by the client."""
+
+def delta_frame(text: str) -> str:
+    return orjson.dumps({"type": "delta", "text": text}).decode()
+
+async def _drain(websocket: WebSocket, outbox: asyncio.Queue):
+    """Send queued messages, coalescing whatever is pending into one frame.
+
+    Pending deltas are merged into one delta frame; deltas queued before a
+    finished message are dropped, since that message replaces them. If a send
+    fails the socket is closed, which ends the connection's receive loop.
+    """
+    try:
+        while True:
+            items = [await outbox.get()]
+            while not outbox.empty():
+                items.append(outbox.get_nowait())
+            last_part = max((i for i, item in enumerate(items) if not isinstance(item, Delta)), default=-1)
+            if last_part >= 0:
+                await websocket.send_text("\n\n".join(item for item in items if not isinstance(item, Delta)))
+            pending = "".join(items[last_part + 1:])
+            if pending:
+                await websocket.send_text(delta_frame(pending))
+    except Exception as e:
+        print(f"WebSocket send error: {e}")
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
 @app.websocket("/ws/{user_id}")
 async def ws_chat(websocket: WebSocket, user_id: str):
     await websocket.accept()
+    # Delta frames only for clients that understand them (?stream=1)
+    stream_tokens = websocket.query_params.get("stream") == "1"
+
+    # Single writer per connection; bursts of queued messages go out as one frame
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=1024)
+    writer = asyncio.create_task(_drain(websocket, outbox))
 
     # Initialize session if new - NO SYSTEM MESSAGE IN CONVERSATION
-    if user_id not in SESSIONS:
-        SESSIONS[user_id] = {"messages": []}
+    get_session(user_id)
 
     # Send psychology-aware welcome
     greeting = get_greeting()
-    await websocket.send_text(f"🎯 **Welcome to Your AI Travel Guide!**\n\n{greeting}\n\n**I specialize in:**\n• 🗺️ **Step-by-step trip planning** (considering meal times & energy levels)\n• 🌤️ **Real-time weather** for perfect timing\n• 🏞️ **Safe attractions** (family-friendly waterfalls first!)\n• 🏨 **Smart accommodation** suggestions\n• 🍛 **Local food** recommendations\n\n**Psychology-aware planning:** I understand when you need breaks, meals, and rest!\n\n**Ready to plan your perfect journey?** Try: 'Plan a 2-day trip to Ooty' or ask about any destination!")
+    outbox.put_nowait(WELCOME_TEMPLATE.format(greeting=greeting))
 
     try:
         while True:
@@ -224,88 +483,89 @@ async def ws_chat(websocket: WebSocket, user_id: str):
             user_text = await websocket.receive_text()
             
             if not user_text.strip():
-                await websocket.send_text("🎯 **I'm here to help with your travel needs!**\n\n**Try asking:**\n• 'Plan a weekend trip to Goa'\n• 'Weather in Manali tomorrow'\n• 'Best places in Kerala'\n• 'Hotels in Ooty'\n\n**What's your travel question?**")
+                outbox.put_nowait(EMPTY_INPUT_MSG)
                 continue
 
             # Check for SOS-related queries
             user_lower = user_text.lower()
-            if any(word in user_lower for word in ["sos", "emergency", "help me", "urgent"]):
+            tokens = tokenize(user_text)
+            if tokens & SOS_WORDS or SOS_PHRASE_RE.search(user_lower):
                 # Handle SOS through the chat interface
-                if "add contact" in user_lower or "setup" in user_lower:
-                    await websocket.send_text("To setup emergency contacts, please use the 'Setup SOS' button in the interface above. This will allow you to add emergency contacts for future SOS alerts.")
+                if SOS_SETUP_RE.search(user_lower):
+                    outbox.put_nowait(SOS_SETUP_MSG)
                     continue
-                elif "sos" in user_lower or "emergency" in user_lower:
-                    await websocket.send_text("For immediate emergency assistance, use the red SOS button (🆘) in the input area. This will instantly send alerts to your saved emergency contacts. If you haven't set up contacts yet, use the 'Setup SOS' button first.")
+                elif "sos" in tokens or "emergency" in tokens:
+                    outbox.put_nowait(SOS_BUTTON_MSG)
                     continue
 
-            # Add user message to session
-            SESSIONS[user_id]["messages"].append(HumanMessage(content=user_text))
+            session = get_session(user_id)
 
-            # Send psychology-aware thinking message
-            if any(word in user_lower for word in ["plan", "trip", "days", "itinerary"]):
-                await websocket.send_text("🎯 **Planning Your Perfect Trip...** \n\nAnalyzing your preferences and gathering the best recommendations!")
-            elif any(word in user_lower for word in ["weather", "places", "directions", "budget"]):
-                await websocket.send_text("🔍 **Gathering Latest Information...** \n\nFetching real-time data for you!")
+            answer_key = answer_cache_key(session, user_text, tokens)
+            cached = ANSWER_CACHE.get(answer_key) if answer_key else None
+            if cached:
+                session["messages"].extend((HumanMessage(content=user_text), AIMessage(content=cached)))
+                outbox.put_nowait(cached)
+                continue
+
+            state = build_state(session, user_text)
 
             try:
-                # Process with graph - with better error handling
-                result = GRAPH.invoke(SESSIONS[user_id])
+                # Stream graph steps so tool progress reaches the user as it happens
+                result = {}
+                async for mode, payload in stream_graph(state):
+                    if mode == "messages":
+                        # Reply tokens, shown as they arrive; dropped once the socket is backed up,
+                        # leaving the rest of the queue for progress and finished messages
+                        chunk, metadata = payload
+                        if (stream_tokens and metadata.get("langgraph_node") == "chatbot"
+                                and outbox.qsize() < outbox.maxsize // 2
+                                and isinstance(chunk.content, str) and chunk.content):
+                            outbox.put_nowait(Delta(chunk.content))
+                        continue
+                    result = payload
+                    if result.get("messages"):
+                        progress = describe_tool_calls(result["messages"][-1])
+                        if progress:
+                            outbox.put_nowait(progress)
 
                 if "messages" in result and result["messages"]:
-                    SESSIONS[user_id] = result
-                    
-                    # Find the latest AI response
-                    latest_ai_response = None
-                    for msg in reversed(result["messages"]):
-                        if (hasattr(msg, 'content') and 
-                            hasattr(msg, 'type') and 
-                            msg.type == 'ai' and 
-                            msg.content and 
-                            isinstance(msg.content, str) and
-                            not (hasattr(msg, 'tool_calls') and msg.tool_calls)):
-                            latest_ai_response = msg.content
-                            break
+                    latest_ai_response = finish_turn(session, state, result, user_text)
 
                     if latest_ai_response:
-                        response_text = latest_ai_response.strip()
-                        
-                        # Enhanced response formatting for frontend
-                        # Convert image links to clickable format
-                        response_text = response_text.replace(
-                            "[See Here]", "[🔗 See Here]"
-                        ).replace(
-                            "[View Here]", "[🔗 View Here]"
-                        ).replace(
-                            "[Check Photo]", "[🔗 Check Photo]"
-                        )
-                        
-                        await websocket.send_text(response_text)
+                        # Convert image links to clickable format for the frontend
+                        response_text = LINK_RE.sub(LINK_SUB, latest_ai_response)
+                        if answer_key and not used_live_data(result["messages"][len(state["messages"]):]):
+                            ANSWER_CACHE.set(answer_key, response_text)
+                        outbox.put_nowait(response_text)
                     else:
                         # Psychology-aware fallback response
-                        if any(word in user_lower for word in ['plan', 'trip', 'days', 'itinerary']):
-                            await websocket.send_text(f"🎯 **Let's Plan Your Perfect Trip!**\n\nI'm analyzing your request for {user_text}. \n\n**Step-by-Step Planning:**\n• First, I'll suggest morning activities (8-11 AM)\n• Then breakfast spots with local specialties\n• Followed by afternoon attractions\n• Evening relaxation and dinner options\n\n✅ **Ready to create your personalized itinerary!**")
+                        if tokens & PLAN_WORDS:
+                            outbox.put_nowait(PLAN_FALLBACK_MSG.format(query=user_text))
                         else:
-                            await websocket.send_text(f"🎯 **Processing Your Travel Query**\n\nI'm gathering information about {user_text}.\n\n**Quick Tips:**\n• For weather: 'Weather in [city]'\n• For places: 'Best places in [destination]'\n• For planning: 'Plan 3-day trip to [location]'\n\n✅ **Ready to help with your travel needs!**")
+                            outbox.put_nowait(GENERIC_FALLBACK_MSG.format(query=user_text))
                 else:
                     # Structured fallback response
-                    await websocket.send_text(f"🎯 **Step 1 of 2: Query Processing**\n\nI understand you're asking about travel. Let me help!\n\n**Step 2 of 2: How to Get Best Results**\n• Be specific about destinations\n• Mention what you need (weather, places, hotels)\n• Ask about trip planning for detailed itineraries\n\n✅ **Ready to assist with your travel needs!**")
+                    outbox.put_nowait(NO_RESULT_MSG)
                     
             except Exception as e:
                 print(f"Graph processing error: {e}")
                 # Provide helpful step-by-step response even on error
-                await websocket.send_text(f"🎯 **Step 1 of 2: Processing Your Travel Query**\n\nI'm here to help with your travel planning! \n\n**Step 2 of 2: Let's Get Started**\nTry asking about:\n• Weather: 'What's the weather in Mumbai?'\n• Places: 'Best places to visit in Goa'\n• Planning: 'Plan a 3-day trip to Kerala'\n\n✅ **Ready to create your perfect travel experience!**")
+                outbox.put_nowait(ERROR_FALLBACK_MSG)
 
     except WebSocketDisconnect:
         print(f"User {user_id} disconnected")
         # Clean up session after disconnect
-        if user_id in SESSIONS:
-            del SESSIONS[user_id]
+        SESSIONS.pop(user_id, None)
     except Exception as e:
         print(f"WebSocket error: {e}")
         try:
             await websocket.send_text("Connection issue. Please refresh and try again.")
         except:
             pass
+    finally:
+        # Stop the writer and collect its outcome so nothing is left unretrieved
+        writer.cancel()
+        await asyncio.gather(writer, return_exceptions=True)
 
 # ----------------------------
 # CLI Mode Support - IMPROVED
@@ -320,9 +580,6 @@ async def run_cli():
     print("="*50 + "\n")
 
     user_id = "cli_user"
-    if user_id not in SESSIONS:
-        SESSIONS[user_id] = {"messages": []}
-
     while True:
         try:
             user_text = input("\nYou: ").strip()
@@ -342,49 +599,21 @@ async def run_cli():
                 print("Ask me anything about travel! Weather, places to visit, directions...")
                 continue
 
-            SESSIONS[user_id]["messages"].append(HumanMessage(content=user_text))
+            session = get_session(user_id)
+            state = build_state(session, user_text)
             
             # Show thinking for relevant queries
-            user_lower = user_text.lower()
-            if any(word in user_lower for word in ["weather", "places", "directions", "budget"]):
+            if tokenize(user_text) & INFO_WORDS:
                 print("Getting latest information...")
 
-            result = GRAPH.invoke(SESSIONS[user_id])
+            result = await run_graph(state)
             
             if "messages" in result and result["messages"]:
-                SESSIONS[user_id] = result
-                
-                # Find latest AI response
-                for msg in reversed(result["messages"]):
-                    if (hasattr(msg, 'content') and 
-                        hasattr(msg, 'type') and 
-                        msg.type == 'ai' and 
-                        msg.content and 
-                        isinstance(msg.content, str) and
-                        not (hasattr(msg, 'tool_calls') and msg.tool_calls)):
-                        
-                        response_text = msg.content.strip()
-                        print(f"\nTravel Guide: {response_text}")
-                        break
+                response_text = finish_turn(session, state, result, user_text)
+                if response_text:
+                    print(f"\nTravel Guide: {response_text}")
                 else:
-                    # Try once more if no response
-                    await asyncio.sleep(0.5)
-                    result2 = GRAPH.invoke(SESSIONS[user_id])
-                    if "messages" in result2 and result2["messages"]:
-                        SESSIONS[user_id] = result2
-                        for msg in reversed(result2["messages"]):
-                            if (hasattr(msg, 'content') and 
-                                hasattr(msg, 'type') and 
-                                msg.type == 'ai' and 
-                                msg.content and 
-                                isinstance(msg.content, str) and
-                                not (hasattr(msg, 'tool_calls') and msg.tool_calls)):
-                                print(f"\nTravel Guide: {msg.content}")
-                                break
-                        else:
-                            print("\nCould you be more specific? Try: 'Weather in Mumbai' or 'Places in Goa'")
-                    else:
-                        print("\nI didn't understand that. Ask about a specific destination!")
+                    print("\nCould you be more specific? Try: 'Weather in Mumbai' or 'Places in Goa'")
             else:
                 print("\nPlease try asking about a specific place or travel need!")
                 
@@ -401,7 +630,9 @@ async def run_cli():
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "cli":
         # Run in CLI mode
-        asyncio.run(run_cli())
+        from tools.session import new_event_loop
+        with asyncio.Runner(loop_factory=new_event_loop) as runner:
+            runner.run(run_cli())
     else:
         # Run in server mode
         print("\nStarting AI Travel Guide Server...")
@@ -410,4 +641,21 @@ if __name__ == "__main__":
         print("API status: http://localhost:7860/api/status")
         print("SOS functionality: Integrated and working\n")
         
-        uvicorn.run("app:app", host="0.0.0.0", port=7860, reload=False)
\ No newline at end of file
+        uvicorn.run(
+            "app:app",
+            host="0.0.0.0",
+            port=7860,
+            reload=False,
+            # Sessions, the answer cache and the SOS contacts cache live in
+            # process memory, so more than one worker is opt-in
+            workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+            # uvloop/httptools when installed (not on Windows), else asyncio/h11
+            loop="auto",
+            http="auto",
+            ws="websockets",
+            ws_per_message_deflate=False,
+            limit_concurrency=1000,
+            backlog=2048,
+            timeout_keep_alive=30,
+            access_log=os.getenv("ACCESS_LOG", "0") == "1",
+        )
\ No newline at end of file
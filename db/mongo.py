@@ -1,6 +1,11 @@
+import asyncio
 import os
-from typing import Optional
+import weakref
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,24 +16,163 @@ MONGO_DB = os.getenv("MONGODB_DB")
 if not MONGO_URI or not MONGO_DB:
     print("⚠️ MongoDB configuration missing - features will be unavailable")
 
-_client: Optional[AsyncIOMotorClient] = AsyncIOMotorClient(MONGO_URI) if MONGO_URI else None
-_db = _client[MONGO_DB] if (_client and MONGO_DB) else None
+# The client is created by connect(), called from the FastAPI lifespan once the
+# event loop is running. Scripts and the CLI get one lazily on first use.
+_client: Optional[AsyncIOMotorClient] = None
+_db = None
+
+def connect(client: Optional[AsyncIOMotorClient] = None) -> Optional[AsyncIOMotorClient]:
+    """Create (or inject) the shared Mongo client and return it."""
+    global _client, _db
+    if client is None and _client is not None:
+        return _client
+    if client is None and MONGO_URI:
+        client = AsyncIOMotorClient(MONGO_URI, maxPoolSize=100, minPoolSize=10)
+    _client = client
+    _db = _client[MONGO_DB] if (_client is not None and MONGO_DB) else None
+    return _client
+
+def close():
+    """Close the shared Mongo client, if one was created."""
+    global _client, _db
+    if _client is not None:
+        _client.close()
+    _client, _db = None, None
+
+def _database():
+    if _db is None:
+        connect()
+    return _db
+
+async def ensure_indexes():
+    """Create the user_id indexes every lookup and upsert relies on."""
+    db = _database()
+    if db is None:
+        return
+    # Plain (non-unique) indexes: older racy upserts may have left duplicate
+    # user_id documents, which would make a unique index build fail
+    await db["contacts"].create_index("user_id")
+    await db["locations"].create_index("user_id")
+    await db["tool_cache"].create_index("expires_at", expireAfterSeconds=0)
+
+# ------------------------
+# Request batching
+# ------------------------
+# Writes and location reads that arrive within BATCH_WINDOW seconds of each
+# other share a single round trip to MongoDB.
+BATCH_WINDOW = 0.01
+
+class _WriteBatch:
+    """Coalesces per-user UpdateOne operations on one collection into bulk_writes.
+
+    Writes are unordered so one user's failure never affects another's; a
+    user's own writes go in successive bulk_writes to keep their order.
+    """
+
+    def __init__(self, collection: Callable):
+        self._collection = collection
+        self._pending: List[Tuple[str, UpdateOne, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def submit(self, user_id: str, op: UpdateOne) -> None:
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((user_id, op, fut))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        await fut
+
+    async def _flush(self):
+        await asyncio.sleep(BATCH_WINDOW)
+        batch, self._pending, self._flush_task = self._pending, [], None
+        # Round n holds each user's n-th write
+        rounds: List[List[Tuple[UpdateOne, asyncio.Future]]] = []
+        seen: Dict[str, int] = {}
+        for user_id, op, fut in batch:
+            n = seen[user_id] = seen.get(user_id, -1) + 1
+            if n == len(rounds):
+                rounds.append([])
+            rounds[n].append((op, fut))
+        for ops in rounds:
+            await self._write(ops)
+
+    async def _write(self, ops: List[Tuple[UpdateOne, asyncio.Future]]):
+        errors: Dict[int, Exception] = {}
+        try:
+            await self._collection().bulk_write([op for op, _ in ops], ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                errors[write_error["index"]] = BulkWriteError({**e.details, "writeErrors": [write_error]})
+        except Exception as e:
+            errors = dict.fromkeys(range(len(ops)), e)
+        for i, (_, fut) in enumerate(ops):
+            if fut.done():
+                continue
+            if i in errors:
+                fut.set_exception(errors[i])
+            else:
+                fut.set_result(None)
+
+class _LocationReads:
+    """Coalesces concurrent get_user_location calls into one $in query."""
+
+    def __init__(self):
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(user_id, []).append(fut)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        return await fut
+
+    async def _flush(self):
+        await asyncio.sleep(BATCH_WINDOW)
+        batch, self._pending, self._flush_task = self._pending, {}, None
+        try:
+            cursor = _locations().find({"user_id": {"$in": list(batch)}})
+            docs = {doc["user_id"]: doc async for doc in cursor}
+        except Exception as e:
+            for futs in batch.values():
+                for fut in futs:
+                    if not fut.done():
+                        fut.set_exception(e)
+            return
+        for user_id, futs in batch.items():
+            for fut in futs:
+                if not fut.done():
+                    fut.set_result(docs.get(user_id))
+
+# Futures and tasks belong to one event loop, so batchers are kept per loop
+_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+def _batcher(name: str, factory: Callable):
+    per_loop = _batchers.setdefault(asyncio.get_running_loop(), {})
+    if name not in per_loop:
+        per_loop[name] = factory()
+    return per_loop[name]
 
 # ------------------------
 # SOS contacts collection
 # ------------------------
 def _contacts():
-    if _db is None:
+    db = _database()
+    if db is None:
         raise RuntimeError("MongoDB not configured")
-    return _db["contacts"]
+    return db["contacts"]
 
 async def add_contact(user_id: str, contact: dict):
     """Add emergency contact for user."""
-    col = _contacts()
-    await col.update_one(
-        {"user_id": user_id},
-        {"$push": {"contacts": contact}},
-        upsert=True
+    _contacts()  # fail fast when MongoDB is not configured
+    await _batcher("contacts", lambda: _WriteBatch(_contacts)).submit(
+        user_id, UpdateOne({"user_id": user_id}, {"$push": {"contacts": contact}}, upsert=True)
+    )
+
+async def add_contacts_bulk(user_id: str, contacts: list):
+    """Add several emergency contacts for user in one update."""
+    _contacts()
+    await _batcher("contacts", lambda: _WriteBatch(_contacts)).submit(
+        user_id, UpdateOne({"user_id": user_id}, {"$push": {"contacts": {"$each": contacts}}}, upsert=True)
     )
 
 async def list_contacts(user_id: str):
@@ -41,20 +185,52 @@ async def list_contacts(user_id: str):
 # Live locations collection
 # ------------------------
 def _locations():
-    if _db is None:
+    db = _database()
+    if db is None:
         raise RuntimeError("MongoDB not configured")
-    return _db["locations"]
+    return db["locations"]
 
 async def upsert_user_location(user_id: str, lat: float, lon: float, city_hint: str = None):
     """Save or update user's live location."""
-    col = _locations()
-    await col.update_one(
-        {"user_id": user_id},
-        {"$set": {"lat": lat, "lon": lon, "city_hint": city_hint}},
-        upsert=True
+    _locations()  # fail fast when MongoDB is not configured
+    await _batcher("locations", lambda: _WriteBatch(_locations)).submit(
+        user_id,
+        UpdateOne(
+            {"user_id": user_id},
+            {"$set": {"lat": lat, "lon": lon, "city_hint": city_hint}},
+            upsert=True
+        )
     )
 
 async def get_user_location(user_id: str):
     """Get user's saved location."""
-    col = _locations()
-    return await col.find_one({"user_id": user_id})
\ No newline at end of file
+    _locations()  # fail fast when MongoDB is not configured
+    return await _batcher("location_reads", _LocationReads).get(user_id)
+
+# ------------------------
+# Tool result cache collection
+# ------------------------
+def _tool_cache():
+    db = _database()
+    if db is None:
+        raise RuntimeError("MongoDB not configured")
+    return db["tool_cache"]
+
+async def get_cached_tool_result(key: str):
+    """Get an unexpired cached tool result as (value, expires_at), or None."""
+    doc = await _tool_cache().find_one(
+        {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}}
+    )
+    if not doc or doc.get("value") is None:
+        return None
+    # Stored as UTC; the client returns naive datetimes
+    return doc["value"], doc["expires_at"].replace(tzinfo=timezone.utc)
+
+async def put_cached_tool_result(key: str, value, ttl: float):
+    """Store a tool result; the TTL index removes it after expiry."""
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+    await _tool_cache().update_one(
+        {"_id": key},
+        {"$set": {"value": value, "expires_at": expires_at}},
+        upsert=True
+    )
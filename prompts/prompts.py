@@ -1,8 +1,5 @@
-def get_trip_agent_prompt():
-    """
-    Return the enhanced system prompt for the Indian Travel AI Assistant.
-    """
-    return """
+# Enhanced system prompt for the Indian Travel AI Assistant, built once at import
+TRIP_AGENT_PROMPT = """
 You are an expert Indian Travel AI Assistant with real-time waterfall safety knowledge.
 
 CRITICAL RULES:
@@ -96,4 +93,11 @@ Is Athirappilly Falls good for your first day? (Yes/No/Alternative)"
 MANDATORY: Always start trip planning with safest waterfall, verify current conditions, get confirmation before proceeding.
 
 END OF PROMPT
-"""
\ No newline at end of file
+"""
+
+
+def get_trip_agent_prompt():
+    """
+    Return the enhanced system prompt for the Indian Travel AI Assistant.
+    """
+    return TRIP_AGENT_PROMPT
@@ -4,126 +4,144 @@ Ensures all tools work properly through frontend with psychology-aware responses
 """
 
 import asyncio
+import inspect
+import re
 from typing import Dict, Any, Optional, List
-from tools.weather import get_weather
-from tools.places import get_places
-from tools.booking import get_booking
-from tools.images import get_images
-from tools.news import get_news
+from tools.cache import singleflight
+
+# Trigger stems, as the old substring checks used; \w* also matches
+# inflections ("visited", "travels", "trips") but not words like "explain"
+TRIP_RE = re.compile(r"\b(?:plan|trip|visit|travel)\w*")
+WEATHER_RE = re.compile(r"\bweather\w*")
+PLACE_RE = re.compile(r"\b(?:places|attractions|visit)\w*")
+HOTEL_RE = re.compile(r"\b(?:hotel|accommodation|stay)\w*")
+IMAGE_RE = re.compile(r"\b(?:images|photos|pictures)\w*")
+PLANNING_RE = re.compile(r"\b(?:plan|trip|days|itinerary)\w*")
+
+# Image link labels, rewritten in one pass by _handle_images
+_IMG_LINK_RE = re.compile(r"\[(?:🔗 )?(See Here|View Here|Check Photo|Look Here|View Picture|Image Available)\]")
+_TO_CLICKABLE = {
+    label: f"[🔗 {label}]"
+    for label in ("See Here", "View Here", "Check Photo", "Look Here", "View Picture")
+}
+_TO_CLICKABLE["Image Available"] = "[Image Available]"
+_TO_PLAIN = dict.fromkeys(_TO_CLICKABLE, "[Image Available]")
+
+_TRIP_NEXT_STEPS = (
+    "**Step 4: What's Next?**\n"
+    "• Shall we plan your breakfast spot near these attractions?\n"
+    "• Would you like hotel recommendations for your stay?\n"
+    "• Ready to plan your afternoon activities (post-lunch 2-5 PM)?\n\n"
+    "🧠 **Psychology-Aware Planning:** I'll consider meal times, energy levels, and family needs for each activity!"
+)
+
+# Psychology tips appended to tool results
+_HOT_TIP = "\n\n🧠 **Psychology Tip:** Hot weather affects energy levels. Plan indoor activities during 12-4 PM, outdoor activities early morning or evening."
+_COLD_TIP = "\n\n🧠 **Psychology Tip:** Cold weather makes people crave warm food and cozy spaces. Perfect time for hot beverages and indoor cultural activities."
+_RAIN_TIP = "\n\n🧠 **Psychology Tip:** Rainy weather creates cozy moods. Great for museums, cafes, and covered markets. Pack umbrella and enjoy the fresh air!"
+_PLACES_TIP = "\n\n🧠 **Psychology Tip:** Visit popular attractions early morning (8-10 AM) when energy is high and crowds are low. Save relaxing spots for afternoon when energy dips."
+_BOOKING_TIP = "\n\n🧠 **Psychology Tip:** Book accommodations near attractions but away from main roads for better sleep. Families prefer ground floor rooms, couples prefer higher floors with views."
+_NEWS_TIP = "\n\n🧠 **Psychology Tip:** Stay informed about local events - festivals boost mood and create memorable experiences, while weather alerts help plan activities."
+
+# Weather words that pick a tip; earlier entries in _TIP_PRIORITY win
+_WEATHER_TRIGGERS = re.compile(r"very hot|35|cold|10|rain", re.IGNORECASE)
+_TIP_PRIORITY = ("very hot", "35", "cold", "10", "rain")
+_TIP_MAP = {"very hot": _HOT_TIP, "35": _HOT_TIP, "cold": _COLD_TIP, "10": _COLD_TIP, "rain": _RAIN_TIP}
+
+# Per-tool replies when a handler raises
+_UNAVAILABLE = {
+    'weather': "❌ Weather service temporarily unavailable. Try asking about a specific city.",
+    'places': "❌ Places service temporarily unavailable. Try a different location or check spelling.",
+    'booking': "❌ Booking service temporarily unavailable. Try searching directly on booking platforms.",
+    'images': "❌ Image service temporarily unavailable. Try searching for '{location}' images online.",
+    'news': "❌ News service temporarily unavailable. Check local news websites for '{location}'.",
+}
+
+@singleflight
+async def _handle_weather(location: str, add_psychology_tips: bool = False) -> str:
+    """Handle weather requests with optional psychology-aware responses."""
+    from tools.weather import get_weather
+    result = await get_weather(location)
+    
+    # Only add psychology tips if requested (for trip planning)
+    if add_psychology_tips:
+        found = {match.lower() for match in _WEATHER_TRIGGERS.findall(result)}
+        tip = next((_TIP_MAP[trigger] for trigger in _TIP_PRIORITY if trigger in found), None)
+        if tip:
+            result += tip
+    
+    return result
+
+@singleflight
+async def _handle_places(location: str, place_type: str = "tourism") -> str:
+    """Handle places requests with automatic image integration."""
+    from tools.places import get_places
+    from tools.images import get_images
+    places_result = await get_places(location, place_type)
+    
+    if place_type == "tourism":
+        # For trip planning, automatically add images
+        try:
+            images_result = await get_images(location)
+            if "📷" in images_result and "🔗" in images_result:
+                places_result += f"\n\n{images_result}"
+        except Exception:
+            # Continue without images if they fail
+            pass
+        
+        # Add psychology-aware timing advice
+        places_result += _PLACES_TIP
+    
+    return places_result
+
+@singleflight
+async def _handle_booking(location: str, place_type: str = "hotel", budget_type: str = "all") -> str:
+    """Handle booking requests with psychology-aware recommendations."""
+    from tools.booking import get_booking
+    return await get_booking(location, place_type, budget_type) + _BOOKING_TIP
+
+@singleflight
+async def _handle_images(location: str, clickable_links: bool = True) -> str:
+    """Handle image requests with optional clickable links."""
+    from tools.images import get_images
+    result = await get_images(location)
+    
+    # Clickable links for trip planning, display text for simple image queries
+    mapping = _TO_CLICKABLE if clickable_links else _TO_PLAIN
+    return _IMG_LINK_RE.sub(lambda m: mapping[m.group(1)], result)
+
+async def _handle_news(location: str) -> str:
+    """Handle news requests with travel-relevant filtering."""
+    from tools.news import get_news
+    return await get_news(location) + _NEWS_TIP
 
 class ToolIntegrator:
     """Integrates all tools with psychology-aware responses and error handling."""
     
     def __init__(self):
         self.tool_map = {
-            'weather': self._handle_weather,
-            'places': self._handle_places,
-            'booking': self._handle_booking,
-            'images': self._handle_images,
-            'news': self._handle_news
+            'weather': _handle_weather,
+            'places': _handle_places,
+            'booking': _handle_booking,
+            'images': _handle_images,
+            'news': _handle_news
         }
     
     async def execute_tool(self, tool_name: str, **kwargs) -> str:
         """Execute a tool with proper error handling and formatting."""
+        handler = self.tool_map.get(tool_name)
+        if handler is None:
+            return f"❌ Unknown tool: {tool_name}"
+        # Reject bad arguments up front so TypeErrors raised inside a tool
+        # still count as the tool being unavailable
         try:
-            if tool_name in self.tool_map:
-                return await self.tool_map[tool_name](**kwargs)
-            else:
-                return f"❌ Unknown tool: {tool_name}"
-        except Exception as e:
+            inspect.signature(handler).bind(**kwargs)
+        except TypeError as e:
             return f"❌ Tool error: {str(e)}"
-    
-    async def _handle_weather(self, location: str, add_psychology_tips: bool = False) -> str:
-        """Handle weather requests with optional psychology-aware responses."""
-        try:
-            result = await get_weather(location)
-            
-            # Only add psychology tips if requested (for trip planning)
-            if add_psychology_tips:
-                if "very hot" in result.lower() or "35" in result:
-                    result += "\n\n🧠 **Psychology Tip:** Hot weather affects energy levels. Plan indoor activities during 12-4 PM, outdoor activities early morning or evening."
-                elif "cold" in result.lower() or "10" in result:
-                    result += "\n\n🧠 **Psychology Tip:** Cold weather makes people crave warm food and cozy spaces. Perfect time for hot beverages and indoor cultural activities."
-                elif "rain" in result.lower():
-                    result += "\n\n🧠 **Psychology Tip:** Rainy weather creates cozy moods. Great for museums, cafes, and covered markets. Pack umbrella and enjoy the fresh air!"
-            
-            return result
-        except Exception as e:
-            return f"❌ Weather service temporarily unavailable. Try asking about a specific city."
-    
-    async def _handle_places(self, location: str, place_type: str = "tourism") -> str:
-        """Handle places requests with automatic image integration."""
         try:
-            places_result = await get_places(location, place_type)
-            
-            # For trip planning, automatically add images
-            if place_type == "tourism":
-                try:
-                    images_result = await get_images(location)
-                    if "📷" in images_result and "🔗" in images_result:
-                        places_result += f"\n\n{images_result}"
-                except:
-                    # Continue without images if they fail
-                    pass
-            
-            # Add psychology-aware timing advice
-            if place_type == "tourism":
-                places_result += "\n\n🧠 **Psychology Tip:** Visit popular attractions early morning (8-10 AM) when energy is high and crowds are low. Save relaxing spots for afternoon when energy dips."
-            
-            return places_result
-        except Exception as e:
-            return f"❌ Places service temporarily unavailable. Try a different location or check spelling."
-    
-    async def _handle_booking(self, location: str, place_type: str = "hotel", budget_type: str = "all") -> str:
-        """Handle booking requests with psychology-aware recommendations."""
-        try:
-            result = await get_booking(location, place_type, budget_type)
-            
-            # Add psychology-aware accommodation advice
-            result += "\n\n🧠 **Psychology Tip:** Book accommodations near attractions but away from main roads for better sleep. Families prefer ground floor rooms, couples prefer higher floors with views."
-            
-            return result
-        except Exception as e:
-            return f"❌ Booking service temporarily unavailable. Try searching directly on booking platforms."
-    
-    async def _handle_images(self, location: str, clickable_links: bool = True) -> str:
-        """Handle image requests with optional clickable links."""
-        try:
-            result = await get_images(location)
-            
-            if clickable_links:
-                # Format as clickable links for trip planning
-                result = result.replace("[See Here]", "[🔗 See Here]")
-                result = result.replace("[View Here]", "[🔗 View Here]")
-                result = result.replace("[Check Photo]", "[🔗 Check Photo]")
-                result = result.replace("[Look Here]", "[🔗 Look Here]")
-                result = result.replace("[View Picture]", "[🔗 View Picture]")
-            else:
-                # Format as display text for simple image queries
-                result = result.replace("[🔗 See Here]", "[Image Available]")
-                result = result.replace("[🔗 View Here]", "[Image Available]")
-                result = result.replace("[🔗 Check Photo]", "[Image Available]")
-                result = result.replace("[See Here]", "[Image Available]")
-                result = result.replace("[View Here]", "[Image Available]")
-                result = result.replace("[Check Photo]", "[Image Available]")
-                result = result.replace("[Look Here]", "[Image Available]")
-                result = result.replace("[View Picture]", "[Image Available]")
-            
-            return result
-        except Exception as e:
-            return f"❌ Image service temporarily unavailable. Try searching for '{location}' images online."
-    
-    async def _handle_news(self, location: str) -> str:
-        """Handle news requests with travel-relevant filtering."""
-        try:
-            result = await get_news(location)
-            
-            # Add psychology-aware news interpretation
-            result += "\n\n🧠 **Psychology Tip:** Stay informed about local events - festivals boost mood and create memorable experiences, while weather alerts help plan activities."
-            
-            return result
-        except Exception as e:
-            return f"❌ News service temporarily unavailable. Check local news websites for '{location}'."
+            return await handler(**kwargs)
+        except Exception:
+            return _UNAVAILABLE[tool_name].format(location=kwargs.get('location', ''))
 
 # Global instance
 tool_integrator = ToolIntegrator()
@@ -133,50 +151,46 @@ async def integrate_tools_for_trip_planning(user_query: str, location: str) -> D
     Integrate multiple tools for comprehensive trip planning.
     Returns a dictionary of tool results.
     """
-    results = {}
-    
-    # Detect what tools are needed based on query
+    # Detect what tools are needed based on query; the dict merges duplicates
     query_lower = user_query.lower()
+    required_tools: Dict[str, Dict[str, Any]] = {}
     
-    # Always get weather for trip planning
-    if any(word in query_lower for word in ['plan', 'trip', 'visit', 'travel']):
-        try:
-            results['weather'] = await tool_integrator.execute_tool('weather', location=location)
-        except:
-            pass
-        
-        try:
-            results['places'] = await tool_integrator.execute_tool('places', location=location, place_type='tourism')
-        except:
-            pass
-        
-        # Auto-add images for trip planning
-        try:
-            results['images'] = await tool_integrator.execute_tool('images', location=location)
-        except:
-            pass
+    # Always get weather, places and images for trip planning
+    if TRIP_RE.search(query_lower):
+        required_tools['weather'] = {}
+        required_tools['places'] = {'place_type': 'tourism'}
+        required_tools['images'] = {}
     
     # Specific tool requests
-    if 'weather' in query_lower:
-        results['weather'] = await tool_integrator.execute_tool('weather', location=location)
-    
-    if any(word in query_lower for word in ['places', 'attractions', 'visit']):
-        results['places'] = await tool_integrator.execute_tool('places', location=location, place_type='tourism')
-    
-    if any(word in query_lower for word in ['hotel', 'accommodation', 'stay']):
-        results['booking'] = await tool_integrator.execute_tool('booking', location=location, place_type='hotel')
-    
-    if any(word in query_lower for word in ['images', 'photos', 'pictures']):
-        results['images'] = await tool_integrator.execute_tool('images', location=location)
-    
-    return results
+    if WEATHER_RE.search(query_lower):
+        required_tools['weather'] = {}
+    
+    if PLACE_RE.search(query_lower):
+        required_tools['places'] = {'place_type': 'tourism'}
+    
+    if HOTEL_RE.search(query_lower):
+        required_tools['booking'] = {'place_type': 'hotel'}
+    
+    if IMAGE_RE.search(query_lower):
+        required_tools['images'] = {}
+    
+    # Run the tools concurrently; total latency is the slowest tool, not the sum
+    done = await asyncio.gather(
+        *(tool_integrator.execute_tool(name, location=location, **kwargs)
+          for name, kwargs in required_tools.items()),
+        return_exceptions=True
+    )
+    return {
+        name: result
+        for name, result in zip(required_tools, done)
+        if not isinstance(result, BaseException)
+    }
 
 def format_psychology_aware_response(user_query: str, tool_results: Dict[str, str], location: str) -> str:
     """
     Format tool results into a psychology-aware response.
     """
-    query_lower = user_query.lower()
-    is_trip_planning = any(word in query_lower for word in ['plan', 'trip', 'days', 'itinerary'])
+    is_trip_planning = bool(PLANNING_RE.search(user_query.lower()))
     
     if is_trip_planning:
         return _format_trip_planning_response(tool_results, location)
@@ -185,44 +199,42 @@ def format_psychology_aware_response(user_query: str, tool_results: Dict[str, st
 
 def _format_trip_planning_response(tool_results: Dict[str, str], location: str) -> str:
     """Format response for trip planning with step-by-step psychology."""
-    response = f"🎯 **Perfect! Let me plan your {location} trip step-by-step:**\n\n"
+    parts = [f"🎯 **Perfect! Let me plan your {location} trip step-by-step:**\n\n"]
     
     # Step 1: Weather for timing
     if 'weather' in tool_results:
-        response += "**Step 1: Weather Analysis for Perfect Timing**\n"
-        response += tool_results['weather'] + "\n\n"
+        parts.append("**Step 1: Weather Analysis for Perfect Timing**\n")
+        parts.append(tool_results['weather'] + "\n\n")
     
     # Step 2: Morning Activity (8-11 AM)
     if 'places' in tool_results:
-        response += "**Step 2: Morning Activity Suggestion (8:00 AM - 11:00 AM)**\n"
-        response += "Based on human energy patterns, here are the best morning activities:\n\n"
-        response += tool_results['places'] + "\n\n"
-        response += "🧠 **Psychology Note:** Morning is when energy is highest - perfect for active sightseeing!\n\n"
+        parts.append("**Step 2: Morning Activity Suggestion (8:00 AM - 11:00 AM)**\n")
+        parts.append("Based on human energy patterns, here are the best morning activities:\n\n")
+        parts.append(tool_results['places'] + "\n\n")
+        parts.append("🧠 **Psychology Note:** Morning is when energy is highest - perfect for active sightseeing!\n\n")
     
     # Step 3: Visual Preview
     if 'images' in tool_results:
-        response += "**Step 3: Visual Preview of Your Destination**\n"
-        response += tool_results['images'] + "\n\n"
+        parts.append("**Step 3: Visual Preview of Your Destination**\n")
+        parts.append(tool_results['images'] + "\n\n")
     
     # Step 4: Next Steps
-    response += "**Step 4: What's Next?**\n"
-    response += "• Shall we plan your breakfast spot near these attractions?\n"
-    response += "• Would you like hotel recommendations for your stay?\n"
-    response += "• Ready to plan your afternoon activities (post-lunch 2-5 PM)?\n\n"
-    response += "🧠 **Psychology-Aware Planning:** I'll consider meal times, energy levels, and family needs for each activity!"
+    parts.append(_TRIP_NEXT_STEPS)
     
-    return response
+    return "".join(parts)
 
 def _format_single_query_response(tool_results: Dict[str, str], user_query: str) -> str:
     """Format response for single queries."""
     if len(tool_results) == 1:
-        return list(tool_results.values())[0]
+        return next(iter(tool_results.values()))
     
-    response = f"🎯 **Here's what I found for your query:**\n\n"
-    for tool_name, result in tool_results.items():
-        response += f"**{tool_name.title()} Information:**\n{result}\n\n"
+    parts = ["🎯 **Here's what I found for your query:**\n\n"]
+    parts.extend(
+        f"**{tool_name.title()} Information:**\n{result}\n\n"
+        for tool_name, result in tool_results.items()
+    )
     
-    return response
+    return "".join(parts)
 
 # Export the main functions
 __all__ = ['tool_integrator', 'integrate_tools_for_trip_planning', 'format_psychology_aware_response']
\ No newline at end of file
@@ -1,14 +1,47 @@
 import os
-import aiohttp
 import asyncio
+import functools
+import time
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from tools.session import close_session, fetch_json
 
 load_dotenv()
 
 RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
 RAPIDAPI_HOST = os.getenv("RAPIDAPI_HOST")
 RAPIDAPI_BASE_URL = os.getenv("RAPIDAPI_BASE_URL")
+_CONFIGURED = all([RAPIDAPI_KEY, RAPIDAPI_HOST, RAPIDAPI_BASE_URL])
+_HEADERS = {"X-RapidAPI-Key": RAPIDAPI_KEY, "X-RapidAPI-Host": RAPIDAPI_HOST}
+_SEARCH_URL = f"{RAPIDAPI_BASE_URL}/api/v1/hotels/searchHotels"
+
+if not _CONFIGURED:
+    print("⚠️ RapidAPI configuration missing - live hotel search will be unavailable")
+
+# ✅ Budget ranges mapping: API price filters and Booking.com URL filters
+_BUDGET_MAP = {
+    "budget": (0, 3000),
+    "average": (3000, 8000),
+    "rich": (8000, 20000),
+    "luxury": (20000, 100000),
+    "all": None
+}
+_BUDGET_RANGES = {
+    "budget": "&price=INR-0-3000",
+    "average": "&price=INR-3000-8000",
+    "rich": "&price=INR-8000-20000",
+    "luxury": "&price=INR-20000-100000",
+    "all": ""
+}
+
+@functools.lru_cache(maxsize=1)
+def _date_pair(hour_bucket: int) -> tuple:
+    """Check-in a week out and check-out the day after, recomputed hourly."""
+    checkin = datetime.now() + timedelta(days=7)
+    return checkin.strftime("%Y-%m-%d"), (checkin + timedelta(days=1)).strftime("%Y-%m-%d")
+
+def _booking_dates() -> tuple:
+    return _date_pair(int(time.time()) // 3600)
 
 async def get_booking(location: str = None, place_type: str = None, budget_type: str = "all") -> str:
     """Interactive booking system for hotels, resorts, cottages with live pricing for Indian travelers."""
@@ -27,22 +60,11 @@ async def get_booking(location: str = None, place_type: str = None, budget_type:
                "Please specify: hotel, resort, cottage, or villa"
     
     # API config check
-    if not all([RAPIDAPI_KEY, RAPIDAPI_HOST, RAPIDAPI_BASE_URL]):
+    if not _CONFIGURED:
         return "❌ API credentials not configured. Cannot fetch hotel data."
     
-    checkin_date = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
-    checkout_date = (datetime.now() + timedelta(days=8)).strftime("%Y-%m-%d")
-    
-    headers = {"X-RapidAPI-Key": RAPIDAPI_KEY, "X-RapidAPI-Host": RAPIDAPI_HOST}
+    checkin_date, checkout_date = _booking_dates()
 
-    # ✅ Budget ranges mapping
-    budget_map = {
-        "budget": (0, 3000),
-        "average": (3000, 8000),
-        "rich": (8000, 20000),
-        "luxury": (20000, 100000),
-        "all": None
-    }
     
     search_params = {
         "dest_type": "city",
@@ -57,36 +79,31 @@ async def get_booking(location: str = None, place_type: str = None, budget_type:
     }
 
     # ✅ Apply budget filter if not "all"
-    budget_choice = budget_map.get(budget_type.lower())
+    budget_choice = _BUDGET_MAP.get(budget_type.lower())
     if budget_choice:
         search_params["price_min"], search_params["price_max"] = budget_choice
     
-    async with aiohttp.ClientSession() as session:
-        search_url = f"{RAPIDAPI_BASE_URL}/api/v1/hotels/searchHotels"
-        
-        try:
-            async with session.get(search_url, headers=headers, params=search_params, timeout=15) as response:
-                if response.status == 404:
-                    return f"❌ Location '{location}' not found via API."
-                elif response.status == 401:
-                    return "❌ API authentication failed - Invalid credentials."
-                elif response.status == 429:
-                    return "❌ API rate limit exceeded. Try again later."
-                elif response.status != 200:
-                    return f"❌ API error: Status {response.status}"
+    try:
+        status, search_data = await fetch_json("GET", _SEARCH_URL, headers=_HEADERS, params=search_params)
+        if status == 404:
+            return f"❌ Location '{location}' not found via API."
+        elif status == 401:
+            return "❌ API authentication failed - Invalid credentials."
+        elif status == 429:
+            return "❌ API rate limit exceeded. Try again later."
+        elif status != 200:
+            return f"❌ API error: Status {status}"
+            
+        if not search_data or not search_data.get("data") or not search_data["data"].get("hotels"):
+            return f"❌ No hotels found for '{location}' via API."
+            
+        # ✅ Success
+        hotel_count = len(search_data['data']['hotels'])
+        budget_info = f" (Budget: {budget_type.title()})" if budget_type.lower() != "all" else ""
+        return f"✅ Found {hotel_count} {place_type.title()}s in {location.title()}{budget_info}!"
                 
-                search_data = await response.json()
-                
-                if not search_data.get("data") or not search_data["data"].get("hotels"):
-                    return f"❌ No hotels found for '{location}' via API."
-                
-                # ✅ Success
-                hotel_count = len(search_data['data']['hotels'])
-                budget_info = f" (Budget: {budget_type.title()})" if budget_type.lower() != "all" else ""
-                return f"✅ Found {hotel_count} {place_type.title()}s in {location.title()}{budget_info}!"
-                
-        except Exception as e:
-            return f"❌ API connection failed: {str(e)}"
+    except Exception as e:
+        return f"❌ API connection failed: {str(e)}"
 
 
 async def handle_booking_conversation(user_input: str, conversation_state: dict = None) -> tuple[str, dict]:
@@ -119,25 +136,15 @@ async def handle_booking_conversation(user_input: str, conversation_state: dict
 
 def _get_fallback_booking(location: str, place_type: str, budget_type: str = "all") -> str:
     """Fallback booking information when API is unavailable - Booking.com only."""
-    checkin_date = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
-    checkout_date = (datetime.now() + timedelta(days=8)).strftime("%Y-%m-%d")
-    
-    # Budget ranges for filtering
-    budget_ranges = {
-        "budget": "&price=INR-0-3000",
-        "average": "&price=INR-3000-8000", 
-        "rich": "&price=INR-8000-20000",
-        "luxury": "&price=INR-20000-100000",
-        "all": ""
-    }
+    checkin_date, checkout_date = _booking_dates()
     
-    budget_filter = budget_ranges.get(budget_type.lower(), "")
+    budget_filter = _BUDGET_RANGES.get(budget_type.lower(), "")
     search_query = f"{place_type}+in+{location.replace(' ', '+')}"
     booking_url = f"https://www.booking.com/searchresults.html?ss={search_query}&checkin={checkin_date}&checkout={checkout_date}&group_adults=2&no_rooms=1&selected_currency=INR{budget_filter}"
     
     # Check why API is unavailable
     api_status = "❌ **API temporarily unavailable**"
-    if not all([RAPIDAPI_KEY, RAPIDAPI_HOST, RAPIDAPI_BASE_URL]):
+    if not _CONFIGURED:
         api_status = "❌ **API credentials not configured**"
     
     result = f"🏨 **{place_type.title()}s in {location.title()}**\n\n{api_status} - Search directly on Booking.com:\n\n"
@@ -160,7 +167,7 @@ def check_api_config():
     print(f"RAPIDAPI_HOST: {'✅ Set' if RAPIDAPI_HOST else '❌ Missing'}")
     print(f"RAPIDAPI_BASE_URL: {'✅ Set' if RAPIDAPI_BASE_URL else '❌ Missing'}")
     
-    if not all([RAPIDAPI_KEY, RAPIDAPI_HOST, RAPIDAPI_BASE_URL]):
+    if not _CONFIGURED:
         print("\n❌ **Missing API credentials!**")
         print("Please add these to your .env file:")
         print("RAPIDAPI_KEY=your_rapidapi_key")
@@ -170,6 +177,19 @@ def check_api_config():
         print("\n✅ **All API credentials configured!**")
     print()
 
+async def _cli():
+    """Prompt for searches until a blank destination, reusing one session."""
+    try:
+        while True:
+            location = (await asyncio.to_thread(input, "Enter destination: ")).strip()
+            if not location:
+                break
+            place_type = await asyncio.to_thread(input, "Enter accommodation type (hotel/resort/cottage/villa): ")
+            budget = await asyncio.to_thread(input, "Enter budget type (budget/average/rich/luxury/all): ") or "all"
+            print(await get_booking(location, place_type, budget))
+    finally:
+        await close_session()
+
 if __name__ == "__main__":
     import sys
     import io
@@ -181,7 +201,4 @@ if __name__ == "__main__":
     print("🏨 Hotel Booking Assistant")
     check_api_config()
     
-    location = input("Enter destination: ")
-    place_type = input("Enter accommodation type (hotel/resort/cottage/villa): ")
-    budget = input("Enter budget type (budget/average/rich/luxury/all): ") or "all"
-    print(asyncio.run(get_booking(location, place_type, budget)))
\ No newline at end of file
+    asyncio.run(_cli())
\ No newline at end of file
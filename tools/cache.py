@@ -0,0 +1,170 @@
+# tools/cache.py
+import asyncio
+import functools
+import inspect
+import time
+import weakref
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Hashable, Optional
+
+try:
+    from db.mongo import get_cached_tool_result, put_cached_tool_result
+except ImportError:
+    async def get_cached_tool_result(key):
+        return None
+    async def put_cached_tool_result(key, value, ttl):
+        return None
+
+_MISSING = object()
+# Upper bound on a persisted-cache read or write; past it the tool just runs
+PERSIST_TIMEOUT = 0.2
+# Strong references to fire-and-forget writes until they finish
+_background: set = set()
+
+
+def _spawn(coro) -> None:
+    task = asyncio.ensure_future(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _persist(key: str, value: Any, ttl: float) -> None:
+    try:
+        async with asyncio.timeout(PERSIST_TIMEOUT):
+            await put_cached_tool_result(key, value, ttl)
+    except Exception:
+        pass
+
+
+class TTLCache:
+    """LRU-bounded mapping whose entries expire ``ttl`` seconds after being set."""
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store ``value``; ``ttl`` overrides the cache-wide lifetime for this entry."""
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def normalize(value: Any) -> Any:
+    """Case/whitespace-insensitive form of a cache key part."""
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+def is_success(result: Any) -> bool:
+    """Tool results worth caching: not empty and not a '❌' error message."""
+    if result is None:
+        return False
+    return not (isinstance(result, str) and result.startswith("❌"))
+
+
+def _key_maker(func):
+    """Build cache keys from a function's normalized, default-filled arguments."""
+    signature = inspect.signature(func)
+
+    def make_key(args, kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return (func.__name__,) + tuple(normalize(v) for v in bound.arguments.values())
+    return make_key
+
+def ttl_cache(ttl: float, maxsize: int = 10_000, persist: bool = False,
+              cache_if: Callable[[Any], bool] = is_success):
+    """Cache an async tool function's results keyed on its normalized arguments.
+
+    Only results accepted by ``cache_if`` are stored, so transient errors are
+    retried on the next call. Concurrent misses for one key share a single
+    call. With ``persist=True`` entries are also written to MongoDB so a warm
+    cache survives restarts; a slow or unreachable Mongo is skipped after
+    PERSIST_TIMEOUT rather than holding up the tool.
+    """
+    def decorator(func):
+        make_key = _key_maker(func)
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+        @singleflight
+        @functools.wraps(func)
+        async def load(*args, **kwargs):
+            key = make_key(args, kwargs)
+            if persist:
+                try:
+                    async with asyncio.timeout(PERSIST_TIMEOUT):
+                        stored = await get_cached_tool_result(repr(key))
+                except Exception:
+                    stored = None
+                if stored is not None:
+                    # Keep it only for what is left of its persisted lifetime
+                    result, expires_at = stored
+                    remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+                    if remaining > 0:
+                        cache.set(key, result, ttl=min(remaining, ttl))
+                        return result
+
+            result = await func(*args, **kwargs)
+            if cache_if(result):
+                cache.set(key, result)
+                if persist:
+                    _spawn(_persist(repr(key), result, ttl))
+            return result
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            result = cache.get(make_key(args, kwargs), _MISSING)
+            if result is not _MISSING:
+                return result
+            return await load(*args, **kwargs)
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+def singleflight(func):
+    """Coalesce concurrent calls with the same normalized arguments into one.
+
+    Callers arriving while a call is in flight await its result instead of
+    repeating the request; the entry is dropped as soon as it completes.
+    """
+    make_key = _key_maker(func)
+    # Futures belong to one event loop, so in-flight calls are tracked per loop
+    inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        key = make_key(args, kwargs)
+        pending = inflight.setdefault(asyncio.get_running_loop(), {})
+        future = pending.get(key)
+        if future is None:
+            future = pending[key] = asyncio.ensure_future(func(*args, **kwargs))
+            future.add_done_callback(lambda _: pending.pop(key, None))
+        # Shielded so one cancelled caller does not cancel the others' result
+        return await asyncio.shield(future)
+
+    return wrapper
@@ -1,39 +1,64 @@
 # tools/maps.py
 import os
-import aiohttp
+import httpx
 import re
 import asyncio
+from typing import Optional
+from urllib.parse import quote_plus
 from dotenv import load_dotenv
+from tools.cache import TTLCache
+from tools.session import close_session, fetch_json, get_client
 
 load_dotenv()
 OPENROUTESERVICE_API_KEY = os.getenv("OPENROUTESERVICE_API_KEY")
+_ORS_HEADERS = {"Authorization": OPENROUTESERVICE_API_KEY}
+_ORS_JSON_HEADERS = {**_ORS_HEADERS, "Content-Type": "application/json"}
+_GEOCODE_URL = "https://api.openrouteservice.org/geocode/search"
+
+if not OPENROUTESERVICE_API_KEY:
+    print("⚠️ OPENROUTESERVICE_API_KEY missing - routes will be unavailable")
 
 TAG_RE = re.compile(r"<[^>]+>")
+# Runs of HTML tags and whitespace, cleaned in one pass: a run with any
+# whitespace outside its tags becomes one space, a run of bare tags vanishes
+_CLEAN_RE = re.compile(r"(?:\s|<[^>]+>)+")
+
+def _clean_run(match: re.Match) -> str:
+    run = match.group(0)
+    return " " if run[0] != "<" or TAG_RE.sub("", run) else ""
+
+def _clean_instruction(instruction: str) -> str:
+    return _CLEAN_RE.sub(_clean_run, instruction).strip()
 
-async def _geocode(address: str, session: aiohttp.ClientSession, timeout: int = 10):
+# Geocoded places rarely move; repeat routes skip both geocoding calls
+_GEO_CACHE = TTLCache(maxsize=2048, ttl=86400)
+
+async def _geocode(address: str, client: Optional[httpx.AsyncClient] = None):
     """Return (lng, lat, formatted_address) or (None, error_message)."""
     
     if not OPENROUTESERVICE_API_KEY:
         return None, "❌ OpenRouteService API key required for location services."
+    key = address.strip().lower()
+    cached = _GEO_CACHE.get(key)
+    if cached:
+        return cached, None
     
-    geocode_url = "https://api.openrouteservice.org/geocode/search"
-    headers = {"Authorization": OPENROUTESERVICE_API_KEY}
     params = {"text": address, "size": 1}
     
-    async with session.get(geocode_url, headers=headers, params=params, timeout=timeout) as resp:
-        if resp.status != 200:
-            return None, f"❌ Location service error: {resp.status}"
-        
-        data = await resp.json()
+    status, data = await fetch_json("GET", _GEOCODE_URL, headers=_ORS_HEADERS, params=params, client=client)
+    if status != 200:
+        return None, f"❌ Location service error: {status}"
 
-    if not data.get("features"):
+    if not data or not data.get("features"):
         return None, f"❌ Location '{address}' not found. Try more specific name."
 
     feature = data["features"][0]
     coords = feature["geometry"]["coordinates"]
     formatted_address = feature["properties"].get("label", address)
     
-    return (coords[0], coords[1], formatted_address), None
+    result = (coords[0], coords[1], formatted_address)
+    _GEO_CACHE.set(key, result)
+    return result, None
 
 async def get_maps(origin: str, destination: str, mode: str = "driving") -> str:
     """Get directions and travel information for Indian travelers using OpenRouteService API only."""
@@ -53,80 +78,83 @@ async def get_maps(origin: str, destination: str, mode: str = "driving") -> str:
     if mode.lower() not in mode_map:
         return "❌ Unsupported mode. Use: driving, walking, bicycling."
 
-    async with aiohttp.ClientSession() as session:
-        # Geocode origin & destination
-        origin_geo, err = await _geocode(origin, session)
-        if err:
-            return err
-        dest_geo, err = await _geocode(destination, session)
-        if err:
-            return err
-
-        # Get directions
-        directions_url = f"https://api.openrouteservice.org/v2/directions/{profile}"
-        headers = {
-            "Authorization": OPENROUTESERVICE_API_KEY,
-            "Content-Type": "application/json"
-        }
-        body = {
-            "coordinates": [[origin_geo[0], origin_geo[1]], [dest_geo[0], dest_geo[1]]],
-            "format": "json",
-            "instructions": True,
-            "units": "m"
-        }
-
-        async with session.post(directions_url, json=body, headers=headers, timeout=20) as resp:
-            if resp.status != 200:
-                return f"❌ Unable to get route data. Status: {resp.status}"
-            
-            data = await resp.json()
-
-        if "routes" not in data or not data["routes"]:
-            return f"❌ No route found from {origin} to {destination}."
-
-        # Parse route
-        route = data["routes"][0]
-        summary = route.get("summary", {})
+    client = await get_client()
+    # Geocode origin & destination concurrently; if one fails the other is cancelled
+    async with asyncio.TaskGroup() as tg:
+        origin_task = tg.create_task(_geocode(origin, client))
+        dest_task = tg.create_task(_geocode(destination, client))
+    (origin_geo, origin_err), (dest_geo, dest_err) = origin_task.result(), dest_task.result()
+    if origin_err or dest_err:
+        return origin_err or dest_err
+
+    # Get directions
+    directions_url = f"https://api.openrouteservice.org/v2/directions/{profile}"
+    body = {
+        "coordinates": [[origin_geo[0], origin_geo[1]], [dest_geo[0], dest_geo[1]]],
+        "format": "json",
+        "instructions": True,
+        "units": "m"
+    }
+
+    status, data = await fetch_json("POST", directions_url, json=body, headers=_ORS_JSON_HEADERS, client=client)
+    if status != 200:
+        return f"❌ Unable to get route data. Status: {status}"
+
+    if not data or not data.get("routes"):
+        return f"❌ No route found from {origin} to {destination}."
+
+    # Parse route
+    route = data["routes"][0]
+    summary = route.get("summary", {})
         
-        distance_km = round(summary.get("distance", 0) / 1000, 1)
-        duration_min = round(summary.get("duration", 0) / 60)
-        duration_text = f"{duration_min // 60}h {duration_min % 60}m" if duration_min >= 60 else f"{duration_min}m"
+    distance_km = round(summary.get("distance", 0) / 1000, 1)
+    duration_min = round(summary.get("duration", 0) / 60)
+    duration_text = f"{duration_min // 60}h {duration_min % 60}m" if duration_min >= 60 else f"{duration_min}m"
         
-        start_address = origin_geo[2] if origin_geo else origin
-        end_address = dest_geo[2] if dest_geo else destination
+    start_address = origin_geo[2] if origin_geo else origin
+    end_address = dest_geo[2] if dest_geo else destination
 
-        # Get main steps
-        steps_out = []
-        segments = route.get("segments", [])
-        for segment in segments[:1]:
-            steps = segment.get("steps", [])
-            for step in steps[:5]:
-                instruction = step.get("instruction", "Continue")
-                instruction = TAG_RE.sub("", instruction)
-                instruction = " ".join(instruction.split())
-                steps_out.append(f"{len(steps_out)+1}. {instruction}")
+    # Get main steps
+    steps_out = []
+    segments = route.get("segments", [])
+    for segment in segments[:1]:
+        steps = segment.get("steps", [])
+        for step in steps[:5]:
+            instruction = step.get("instruction", "Continue")
+            instruction = _clean_instruction(instruction)
+            steps_out.append(f"{len(steps_out)+1}. {instruction}")
 
-        google_maps_link = f"https://www.google.com/maps/dir/{origin.replace(' ', '+')}/{destination.replace(' ', '+')}"
+    google_maps_link = f"https://www.google.com/maps/dir/{quote_plus(origin)}/{quote_plus(destination)}"
 
-        result = f"🗺️ Route from {start_address} to {end_address}:\n\n"
-        result += f"📏 Distance: {distance_km} km\n"
-        result += f"⏱️ Duration: {duration_text} ({mode})\n\n"
-        if steps_out:
-            result += "🛣️ Main directions:\n" + "\n".join(steps_out) + "\n\n"
-        result += f"🔗 Full directions: {google_maps_link}\n\n"
-        result += f"💡 Plan your journey considering Indian traffic conditions!"
+    result = f"🗺️ Route from {start_address} to {end_address}:\n\n"
+    result += f"📏 Distance: {distance_km} km\n"
+    result += f"⏱️ Duration: {duration_text} ({mode})\n\n"
+    if steps_out:
+        result += "🛣️ Main directions:\n" + "\n".join(steps_out) + "\n\n"
+    result += f"🔗 Full directions: {google_maps_link}\n\n"
+    result += f"💡 Plan your journey considering Indian traffic conditions!"
 
-        return result
+    return result
 
 
 # ----------------- Run Individually -----------------
+async def _cli():
+    """Prompt for routes until a blank origin, reusing one session."""
+    try:
+        while True:
+            origin = (await asyncio.to_thread(input, "Enter origin: ")).strip()
+            if not origin:
+                break
+            destination = (await asyncio.to_thread(input, "Enter destination: ")).strip()
+            mode = (await asyncio.to_thread(input, "Enter mode (driving/walking/bicycling): ")).strip() or "driving"
+
+            if destination:
+                output = await get_maps(origin, destination, mode)
+                print("\n" + output)
+            else:
+                print("❌ Please provide both origin and destination.")
+    finally:
+        await close_session()
+
 if __name__ == "__main__":
-    origin = input("Enter origin: ").strip()
-    destination = input("Enter destination: ").strip()
-    mode = input("Enter mode (driving/walking/bicycling): ").strip() or "driving"
-
-    if origin and destination:
-        output = asyncio.run(get_maps(origin, destination, mode))
-        print("\n" + output)
-    else:
-        print("❌ Please provide both origin and destination.")
+    asyncio.run(_cli())
@@ -1,14 +1,27 @@
 # tools/news.py
 import os
-import aiohttp
 import asyncio
+import re
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from tools.cache import ttl_cache
+from tools.session import SEARCH_TIMEOUT, get_json
 
 load_dotenv()
 
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
-
+MAX_ARTICLES = 6
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# Title keyword -> emoji, first match wins (substring match, like before)
+_EMOJI_RULES = [
+    (re.compile(r"hotel|resort", re.I), "🏨"),
+    (re.compile(r"temple|heritage|festival", re.I), "🏛️"),
+    (re.compile(r"food|restaurant", re.I), "🍛"),
+    (re.compile(r"airport|flight", re.I), "✈️"),
+]
+
+@ttl_cache(ttl=900, persist=True)
 async def get_news(location: str) -> str:
     """Get recent travel and tourism news for the specified location - simple and accurate."""
     
@@ -31,79 +44,68 @@ async def get_news(location: str) -> str:
     
     headers = {"X-API-Key": NEWS_API_KEY}
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers, params=params, timeout=30) as response:
-            if response.status != 200:
-                return f"❌ Unable to fetch news data. Status: {response.status}"
-
-            data = await response.json()
-            articles = data.get("articles", [])
-
-            if not articles:
-                # Try simpler search
-                simple_params = params.copy()
-                simple_params["q"] = f'{location} travel'
-                
-                async with session.get(url, headers=headers, params=simple_params) as retry_response:
-                    if retry_response.status == 200:
-                        retry_data = await retry_response.json()
-                        articles = retry_data.get("articles", [])
-
-            if not articles:
-                return f"❌ No recent news found for {location}. Try checking local tourism websites."
-
-            # Filter for location relevance
-            location_articles = []
-            location_lower = location.lower()
+    status, data = await get_json("GET", url, headers=headers, params=params, timeout=SEARCH_TIMEOUT)
+    if status != 200:
+        return f"❌ Unable to fetch news data. Status: {status}"
+
+    articles = (data or {}).get("articles", [])
+
+    if not articles:
+        # Try simpler search
+        simple_params = params.copy()
+        simple_params["q"] = f'{location} travel'
+            
+        retry_status, retry_data = await get_json("GET", url, headers=headers, params=simple_params, timeout=SEARCH_TIMEOUT)
+        if retry_status == 200:
+            articles = (retry_data or {}).get("articles", [])
+
+    if not articles:
+        return f"❌ No recent news found for {location}. Try checking local tourism websites."
+
+    # Filter for location relevance
+    location_articles = []
+    location_folded = location.casefold()
+        
+    for article in articles:
+        # One fold over title and description; the separator keeps a match
+        # from spanning the two
+        haystack = f"{article.get('title') or ''}\n{article.get('description') or ''}".casefold()
+        if location_folded in haystack:
+            location_articles.append(article)
+            if len(location_articles) >= MAX_ARTICLES:
+                break
+
+    if not location_articles:
+        location_articles = articles[:MAX_ARTICLES]  # Fallback to general results
+
+    # Format results
+    parts = [f"📰 Latest News for {location.title()}:\n\n"]
+        
+    for i, article in enumerate(location_articles, 1):
+        title = article.get("title", "No title")
+        source = article.get("source", {}).get("name", "Unknown")
+        published = article.get("publishedAt") or ""
+        url_link = article.get("url", "")
             
-            for article in articles:
-                title = article.get("title", "").lower()
-                description = (article.get("description") or "").lower()
-                
-                if location_lower in title or location_lower in description:
-                    location_articles.append(article)
-
-            if not location_articles:
-                location_articles = articles[:6]  # Fallback to general results
-
-            # Format results
-            result = f"📰 Latest News for {location.title()}:\n\n"
+        # Clean title
+        if len(title) > 80:
+            title = title[:77] + "..."
             
-            for i, article in enumerate(location_articles[:6], 1):
-                title = article.get("title", "No title")
-                source = article.get("source", {}).get("name", "Unknown")
-                published = article.get("publishedAt", "")
-                url_link = article.get("url", "")
-                
-                # Clean title
-                if len(title) > 80:
-                    title = title[:77] + "..."
-                
-                # Format date
-                if published:
-                    pub_date = datetime.fromisoformat(published.replace("Z", "+00:00")).strftime("%b %d")
-                else:
-                    pub_date = "Recent"
-
-                # Simple emoji selection
-                title_lower = title.lower()
-                if any(word in title_lower for word in ["hotel", "resort"]):
-                    emoji = "🏨"
-                elif any(word in title_lower for word in ["temple", "heritage", "festival"]):
-                    emoji = "🏛️"
-                elif any(word in title_lower for word in ["food", "restaurant"]):
-                    emoji = "🍛"
-                elif any(word in title_lower for word in ["airport", "flight"]):
-                    emoji = "✈️"
-                else:
-                    emoji = "📰"
-
-                result += f"{emoji} {title}\n"
-                result += f"   📅 {pub_date} | 🏢 {source}\n"
-                result += f"   🔗 {url_link}\n\n"
-
-            result += f"💡 Stay updated with the latest happenings in {location}!"
-            return result
+        # Format date: publishedAt is always YYYY-MM-DDTHH:MM:SSZ, so slice it
+        try:
+            pub_date = f"{_MONTHS[int(published[5:7]) - 1]} {published[8:10]}"
+        except (ValueError, IndexError):
+            pub_date = "Recent"
+
+        # Simple emoji selection
+        emoji = next((e for rule, e in _EMOJI_RULES if rule.search(title)), "📰")
+
+        parts.append(f"{emoji} {title}\n")
+        parts.append(f"   📅 {pub_date} | 🏢 {source}\n")
+        parts.append(f"   🔗 {url_link}\n\n")
+
+    parts.append(f"💡 Stay updated with the latest happenings in {location}!")
+    return "".join(parts)
 
 
 # ----------------- Run Individually -----------------
@@ -1,8 +1,9 @@
 import os
-import aiohttp
 import asyncio
 from dotenv import load_dotenv
 from typing import Optional, Tuple, List, Dict
+from tools.cache import ttl_cache
+from tools.session import OVERPASS_TIMEOUT, SEARCH_TIMEOUT, get_json
 
 load_dotenv()
 OPENROUTESERVICE_API_KEY = os.getenv("OPENROUTESERVICE_API_KEY")
@@ -10,87 +11,88 @@ OPENROUTESERVICE_API_KEY = os.getenv("OPENROUTESERVICE_API_KEY")
 # -----------------------------------------------------------------------------
 # Geocode: Nominatim
 # -----------------------------------------------------------------------------
+@ttl_cache(ttl=86400)
 async def geocode_location(location: str) -> Optional[Tuple[float, float, Tuple[float, float, float, float]]]:
     url = "https://nominatim.openstreetmap.org/search"
     params = {"q": location, "format": "json", "limit": 1, "addressdetails": 1}
     headers = {"User-Agent": "IndianTravelApp/1.0", "Accept-Language": "en"}
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params, headers=headers, timeout=10) as resp:
-            if resp.status != 200:
-                return None
-            data = await resp.json()
-            if not data:
-                return None
-            item = data[0]
-            lat = float(item.get("lat"))
-            lon = float(item.get("lon"))
-            bb = item.get("boundingbox", [])
-            if len(bb) == 4:
-                # Nominatim boundingbox: [south, north, west, east]
-                south = float(bb[0]); north = float(bb[1]); west = float(bb[2]); east = float(bb[3])
-                return lat, lon, (south, west, north, east)
-            else:
-                d = 0.03
-                return lat, lon, (lat - d, lon - d, lat + d, lon + d)
+    status, data = await get_json("GET", url, params=params, headers=headers, timeout=SEARCH_TIMEOUT)
+    if status != 200 or not data:
+        return None
+    item = data[0]
+    lat = float(item.get("lat"))
+    lon = float(item.get("lon"))
+    bb = item.get("boundingbox", [])
+    if len(bb) == 4:
+        # Nominatim boundingbox: [south, north, west, east]
+        south = float(bb[0]); north = float(bb[1]); west = float(bb[2]); east = float(bb[3])
+        return lat, lon, (south, west, north, east)
+    else:
+        d = 0.03
+        return lat, lon, (lat - d, lon - d, lat + d, lon + d)
 
 # -----------------------------------------------------------------------------
 # Overpass query builder: include many tourism-related tags
 # -----------------------------------------------------------------------------
-def build_overpass_queries(bbox: Tuple[float, float, float, float], place_type: str) -> str:
-    south, west, north, east = bbox
-    tag_groups = []
-    if place_type == "tourism":
-        tag_groups = [
-            'node["tourism"="attraction"]', 'way["tourism"="attraction"]', 'relation["tourism"="attraction"]',
-            'node["tourism"="viewpoint"]', 'way["tourism"="viewpoint"]', 'relation["tourism"="viewpoint"]',
-            'node["tourism"="museum"]', 'node["tourism"="gallery"]',
-            'node["historic"]', 'node["leisure"="park"]', 'node["natural"="peak"]',
-            'node["natural"="waterfall"]', 'node["amenity"="theatre"]', 'node["tourism"="information"]',
-            'node["place"="locality"]',
-        ]
-    elif place_type == "restaurant":
-        tag_groups = ['node["amenity"="restaurant"]', 'way["amenity"="restaurant"]', 'relation["amenity"="restaurant"]']
-    elif place_type == "hotel":
-        tag_groups = ['node["tourism"="hotel"]', 'way["tourism"="hotel"]', 'relation["tourism"="hotel"]']
-    else:
-        tag_groups = ['node["name"]', 'way["name"]', 'relation["name"]']
+_TAG_GROUPS = {
+    "tourism": (
+        'node["tourism"="attraction"]', 'way["tourism"="attraction"]', 'relation["tourism"="attraction"]',
+        'node["tourism"="viewpoint"]', 'way["tourism"="viewpoint"]', 'relation["tourism"="viewpoint"]',
+        'node["tourism"="museum"]', 'node["tourism"="gallery"]',
+        'node["historic"]', 'node["leisure"="park"]', 'node["natural"="peak"]',
+        'node["natural"="waterfall"]', 'node["amenity"="theatre"]', 'node["tourism"="information"]',
+        'node["place"="locality"]',
+    ),
+    "restaurant": ('node["amenity"="restaurant"]', 'way["amenity"="restaurant"]', 'relation["amenity"="restaurant"]'),
+    "hotel": ('node["tourism"="hotel"]', 'way["tourism"="hotel"]', 'relation["tourism"="hotel"]'),
+}
+_DEFAULT_TAG_GROUPS = ('node["name"]', 'way["name"]', 'relation["name"]')
 
-    queries = [f'{tg}({south},{west},{north},{east});' for tg in tag_groups]
-    return "[out:json][timeout:25];(" + "".join(queries) + ");out center;"
+# Query body per place type with a "{bbox}" slot, filled in per probe scale
+_QUERY_TEMPLATES = {
+    place_type: "[out:json][timeout:25];(" + "".join(f"{tg}({{bbox}});" for tg in groups) + ");out center;"
+    for place_type, groups in {**_TAG_GROUPS, None: _DEFAULT_TAG_GROUPS}.items()
+}
+
+def build_overpass_queries(bbox: Tuple[float, float, float, float], place_type: str) -> str:
+    template = _QUERY_TEMPLATES.get(place_type, _QUERY_TEMPLATES[None])
+    return template.replace("{bbox}", "{},{},{},{}".format(*bbox))
 
 # -----------------------------------------------------------------------------
 # Query Overpass and parse results
 # -----------------------------------------------------------------------------
+@ttl_cache(ttl=3600)
 async def overpass_search(bbox: Tuple[float, float, float, float], place_type: str, max_results: int = 20) -> Optional[List[Dict]]:
     overpass_url = "https://overpass-api.de/api/interpreter"
     query = build_overpass_queries(bbox, place_type)
-    async with aiohttp.ClientSession() as session:
-        async with session.post(overpass_url, data=query, timeout=30) as resp:
-            if resp.status != 200:
-                return None
-            data = await resp.json()
-            elements = data.get("elements", [])
-            results = []
-            seen = set()
-            for el in elements:
-                tags = el.get("tags", {})
-                name = tags.get("name")
-                if not name:
-                    continue
-                key = name.strip().lower()
-                if key in seen:
-                    continue
-                seen.add(key)
-                if el.get("type") == "node":
-                    lat = el.get("lat"); lon = el.get("lon")
-                else:
-                    center = el.get("center") or {}
-                    lat = center.get("lat"); lon = center.get("lon")
-                category = tags.get("tourism") or tags.get("amenity") or tags.get("historic") or tags.get("leisure") or tags.get("natural") or "Place"
-                results.append({"name": name.strip(), "category": category, "lat": lat, "lon": lon, "tags": tags})
-                if len(results) >= max_results:
-                    break
-            return results if results else None
+    status, data = await get_json("POST", overpass_url, data=query, timeout=OVERPASS_TIMEOUT)
+    if status != 200 or data is None:
+        return None
+    elements = data.get("elements", [])
+    results = []
+    # Exact repeats (a node and way sharing a name) are rejected on the raw
+    # string before paying for strip().lower() on Unicode names
+    seen, seen_raw = set(), set()
+    for el in elements:
+        tags = el.get("tags", {})
+        name = tags.get("name")
+        if not name or name in seen_raw:
+            continue
+        seen_raw.add(name)
+        key = name.strip().lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        if el.get("type") == "node":
+            lat = el.get("lat"); lon = el.get("lon")
+        else:
+            center = el.get("center") or {}
+            lat = center.get("lat"); lon = center.get("lon")
+        category = tags.get("tourism") or tags.get("amenity") or tags.get("historic") or tags.get("leisure") or tags.get("natural") or "Place"
+        results.append({"name": name.strip(), "category": category, "lat": lat, "lon": lon, "tags": tags})
+        if len(results) >= max_results:
+            break
+    return results if results else None
 
 # -----------------------------------------------------------------------------
 # Nominatim fallback
@@ -100,33 +102,67 @@ async def nominatim_search_named(location: str, place_type: str, max_results: in
     q = f"{place_type} {location}"
     params = {"q": q, "format": "json", "limit": max_results, "addressdetails": 1, "extratags": 1, "namedetails": 1}
     headers = {"User-Agent": "IndianTravelApp/1.0", "Accept-Language": "en"}
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params, headers=headers, timeout=12) as resp:
-            if resp.status != 200:
-                return None
-            data = await resp.json()
-            results = []
-            seen = set()
-            for item in data:
-                namedetails = item.get("namedetails") or {}
-                name = namedetails.get("name") or item.get("display_name", "").split(",")[0].strip()
-                if not name:
-                    continue
-                key = name.strip().lower()
-                if key in seen:
-                    continue
-                seen.add(key)
-                lat = float(item.get("lat")) if item.get("lat") else None
-                lon = float(item.get("lon")) if item.get("lon") else None
-                category = item.get("type") or item.get("class") or "Place"
-                importance = float(item.get("importance") or 0)
-                results.append({"name": name.strip(), "category": category, "lat": lat, "lon": lon, "importance": importance, "raw": item})
-            results.sort(key=lambda r: r.get("importance", 0), reverse=True)
-            return results if results else None
+    status, data = await get_json("GET", url, params=params, headers=headers, timeout=SEARCH_TIMEOUT)
+    if status != 200 or data is None:
+        return None
+    results = []
+    seen = set()
+    for item in data:
+        namedetails = item.get("namedetails") or {}
+        name = namedetails.get("name") or item.get("display_name", "").split(",")[0].strip()
+        if not name:
+            continue
+        key = name.strip().lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        lat = float(item.get("lat")) if item.get("lat") else None
+        lon = float(item.get("lon")) if item.get("lon") else None
+        category = item.get("type") or item.get("class") or "Place"
+        importance = float(item.get("importance") or 0)
+        results.append({"name": name.strip(), "category": category, "lat": lat, "lon": lon, "importance": importance, "raw": item})
+    results.sort(key=lambda r: r.get("importance", 0), reverse=True)
+    return results if results else None
+
+# -----------------------------------------------------------------------------
+# Overpass probes: the geocoded bbox at growing scales
+# -----------------------------------------------------------------------------
+PROBE_SCALES = (1.0, 1.8, 3.5)
+
+def scale_bbox(bbox: Tuple[float, float, float, float], scale: float) -> Tuple[float, float, float, float]:
+    south, west, north, east = bbox
+    mid_lat = (south + north) / 2
+    mid_lon = (west + east) / 2
+    half_lat = (north - south) / 2 * scale
+    half_lon = (east - west) / 2 * scale
+    return (mid_lat - half_lat, mid_lon - half_lon, mid_lat + half_lat, mid_lon + half_lon)
+
+async def _probe(bbox: Tuple[float, float, float, float], place_type: str) -> Optional[List[Dict]]:
+    try:
+        return await overpass_search(bbox, place_type, max_results=30)
+    except Exception:
+        return None
+
+async def overpass_probe(bbox: Tuple[float, float, float, float], place_type: str) -> Optional[List[Dict]]:
+    """Smallest scale with at least 3 results, else the smallest non-empty one.
+
+    Scales are tried one at a time, smallest first: the public Overpass server
+    allows only a few concurrent requests per IP, and the 1.0 scale is usually
+    enough on its own.
+    """
+    best = None
+    for scale in PROBE_SCALES:
+        results = await _probe(scale_bbox(bbox, scale), place_type)
+        if results and len(results) >= 3:
+            return results
+        if results and not best:
+            best = results
+    return best
 
 # -----------------------------------------------------------------------------
 # Main function
 # -----------------------------------------------------------------------------
+@ttl_cache(ttl=86400, persist=True)
 async def get_places(location: str, place_type: str = "tourism") -> str:
     if not location or not location.strip():
         return "❌ Provide a valid location."
@@ -136,21 +172,10 @@ async def get_places(location: str, place_type: str = "tourism") -> str:
 
     if geo:
         lat, lon, bbox = geo
-        scales = [1.0, 1.8, 3.5]
-        base_south, base_west, base_north, base_east = bbox
-        for scale in scales:
-            mid_lat = (base_south + base_north) / 2
-            mid_lon = (base_west + base_east) / 2
-            half_lat = (base_north - base_south) / 2 * scale
-            half_lon = (base_east - base_west) / 2 * scale
-            trial_bbox = (mid_lat - half_lat, mid_lon - half_lon, mid_lat + half_lat, mid_lon + half_lon)
-            results = await overpass_search(trial_bbox, place_type, max_results=30)
-            if results and len(results) >= 3:
-                places_result = results
-                break
-            if results and len(results) > 0 and not places_result:
-                places_result = results
+        places_result = await overpass_probe(bbox, place_type)
 
+    # Nominatim search only as a fallback: its usage policy allows one
+    # request per second, and the geocode above was already one
     if not places_result or len(places_result) < 3:
         nomi = await nominatim_search_named(location, place_type, max_results=20)
         if nomi:
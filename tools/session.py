@@ -0,0 +1,172 @@
+# tools/session.py
+import asyncio
+import random
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+import httpx
+import orjson
+
+try:
+    import uvloop
+except ImportError:  # not available on Windows
+    uvloop = None
+
+# ------------------------
+# Shared HTTP session
+# ------------------------
+# One pooled ClientSession per event loop (aiohttp sessions are bound to the
+# loop they were created on), reused by every tool instead of a new
+# TCP + TLS handshake per call.
+_sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+
+# Fail fast on stuck connects; allow slow APIs time to send the body
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=20, connect=3, sock_read=15)
+# Search APIs (Nominatim, NewsAPI) and Overpass, whose server-side query
+# timeout is 25s so the first byte can take that long
+SEARCH_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=5, sock_connect=5, sock_read=10)
+OVERPASS_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=5, sock_connect=5, sock_read=27)
+# Small single-object lookups (current weather, reverse geocoding)
+LOOKUP_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=3, sock_read=7)
+HTTPX_TIMEOUT = httpx.Timeout(20.0, connect=3.0, read=15.0)
+# Transient upstream failures worth another attempt
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# One retry policy for fetch_json and get_json: two tries in all, so a
+# transient failure is retried once after RETRY_BACKOFF * (0.5-1.5) seconds
+RETRY_ATTEMPTS = 2
+RETRY_BACKOFF = 0.5
+# A 429 waits for Retry-After, or at least a second (Nominatim allows one
+# request per second); longer waits than RETRY_AFTER_MAX are not retried
+RATE_LIMIT_DELAY = 1.0
+RETRY_AFTER_MAX = 10.0
+
+async def get_session() -> aiohttp.ClientSession:
+    """Return the shared ClientSession for the running event loop."""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        for stale in [l for l in _sessions if l.is_closed()]:
+            del _sessions[stale]
+        session = _sessions[loop] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100, limit_per_host=20, ttl_dns_cache=300, keepalive_timeout=75
+            ),
+            timeout=DEFAULT_TIMEOUT,
+        )
+    return session
+
+# HTTP/2 clients for the JSON APIs (RapidAPI, Unsplash, OpenRouteService):
+# parallel requests to one host multiplex over a single TLS connection.
+_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+async def get_client() -> httpx.AsyncClient:
+    """Return the shared HTTP/2 AsyncClient for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        for stale in [l for l in _clients if l.is_closed()]:
+            del _clients[stale]
+        client = _clients[loop] = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=HTTPX_TIMEOUT,
+        )
+    return client
+
+async def _with_retries(send, retry_errors, attempts: int, backoff: float) -> Tuple[int, Any]:
+    """Shared retry policy: call send() -> (status, headers, body bytes) until it succeeds.
+
+    retry_errors and RETRY_STATUSES responses are retried with exponential
+    backoff and jitter, and a 429 also honours Retry-After; the body is only
+    parsed on a 200.
+    """
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        delay = backoff * 2 ** attempt * (0.5 + random.random())
+        try:
+            status, headers, body = await send()
+            if status == 429:
+                delay = max(delay, _retry_after(headers.get("Retry-After")))
+            if status not in RETRY_STATUSES or last or delay > RETRY_AFTER_MAX:
+                return status, (orjson.loads(body) if status == 200 and body else None)
+        except retry_errors:
+            if last:
+                raise
+        await asyncio.sleep(delay)
+
+def _retry_after(value: Optional[str]) -> float:
+    """Seconds asked for by a Retry-After header; RATE_LIMIT_DELAY if absent or a date."""
+    try:
+        return max(float(value), RATE_LIMIT_DELAY)
+    except (TypeError, ValueError):
+        return RATE_LIMIT_DELAY
+
+async def fetch_json(method: str, url: str, *, attempts: int = RETRY_ATTEMPTS,
+                     backoff: float = RETRY_BACKOFF,
+                     client: Optional[httpx.AsyncClient] = None,
+                     **kwargs) -> Tuple[int, Any]:
+    """Send a request on the shared HTTP/2 client: (status, JSON body or None)."""
+    client = client or await get_client()
+
+    async def send():
+        resp = await client.request(method, url, **kwargs)
+        return resp.status_code, resp.headers, resp.content
+
+    return await _with_retries(send, httpx.TransportError, attempts, backoff)
+
+async def get_json(method: str, url: str, *, attempts: int = RETRY_ATTEMPTS,
+                   backoff: float = RETRY_BACKOFF, **kwargs) -> Tuple[int, Any]:
+    """fetch_json for the aiohttp session: (status, JSON body or None)."""
+    session = await get_session()
+
+    async def send():
+        async with session.request(method, url, **kwargs) as resp:
+            return resp.status, resp.headers, await resp.read()
+
+    return await _with_retries(send, (aiohttp.ClientError, asyncio.TimeoutError), attempts, backoff)
+
+async def close_session():
+    """Close the running loop's shared ClientSession and AsyncClient, if any."""
+    loop = asyncio.get_running_loop()
+    session = _sessions.pop(loop, None)
+    if session is not None:
+        await session.close()
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+# ------------------------
+# Tool event loop
+# ------------------------
+# Synchronous callers (tool.invoke from scripts, the trip_agent sync tool
+# entry points) run their coroutines on one long-lived background loop so its
+# pooled session survives between calls.
+_tool_loop: Optional[asyncio.AbstractEventLoop] = None
+_tool_loop_lock = threading.Lock()
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """A uvloop loop when installed (as uvicorn uses), else the asyncio default."""
+    return uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
+
+def _get_tool_loop() -> asyncio.AbstractEventLoop:
+    global _tool_loop
+    with _tool_loop_lock:
+        if _tool_loop is None:
+            _tool_loop = new_event_loop()
+            threading.Thread(target=_tool_loop.run_forever, name="tools", daemon=True).start()
+    return _tool_loop
+
+def run_sync(coro):
+    """Run a coroutine on the tool loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_tool_loop()).result()
+
+def stop_tool_loop():
+    """Close the tool loop's session and stop the loop (blocking)."""
+    global _tool_loop
+    with _tool_loop_lock:
+        loop, _tool_loop = _tool_loop, None
+    if loop is None:
+        return
+    asyncio.run_coroutine_threadsafe(close_session(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
@@ -1,48 +1,82 @@
 #sos.py
 import os
 import sys
-import json
 import asyncio
+import logging
+import random
+import threading
 import time
+import orjson
 from datetime import datetime
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
 
+log = logging.getLogger(__name__)
+
 # Add parent directory to path for db imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from db.mongo import add_contact as mongo_add_contact, list_contacts as mongo_list_contacts
+    from db.mongo import (
+        add_contact as mongo_add_contact,
+        add_contacts_bulk as mongo_add_contacts_bulk,
+        list_contacts as mongo_list_contacts,
+    )
 except ImportError:
-    print("Warning: MongoDB not available, using local storage fallback")
+    log.warning("MongoDB not available, using local storage fallback")
     # Fallback if import fails
     async def mongo_add_contact(user_id, contact):
-        print(f"MongoDB fallback: Would add contact {contact} for user {user_id}")
+        log.info("MongoDB fallback: Would add contact %s for user %s", contact, user_id)
+        return True
+    async def mongo_add_contacts_bulk(user_id, contacts):
+        log.info("MongoDB fallback: Would add %d contacts for user %s", len(contacts), user_id)
         return True
     async def mongo_list_contacts(user_id):
-        print(f"MongoDB fallback: Would list contacts for user {user_id}")
+        log.info("MongoDB fallback: Would list contacts for user %s", user_id)
         return []
 
-# Fix missing functions
+from tools.cache import TTLCache
+
+# Repeated listings reuse a recent result; writes drop the user's entry (in
+# this worker only, so the SOS trigger itself always reads fresh)
+_contacts_cache = TTLCache(maxsize=1000, ttl=15)
+
+async def _cached_list_contacts(user_id: str) -> list:
+    """mongo_list_contacts, reusing a non-empty result from the last few seconds."""
+    records = _contacts_cache.get(user_id)
+    if records is None:
+        records = await mongo_list_contacts(user_id)
+        # An empty list is likely about to change (contacts being set up)
+        if records:
+            _contacts_cache.set(user_id, records)
+    return records
+
+def _normalize_contact_payload(contact_data: dict) -> dict:
+    """The contact as stored: name, relation and the normalized number."""
+    contact = Contact(**contact_data)
+    return {"name": contact.name, "number": contact.number, "relation": contact.relation}
+
 async def add_single_contact(user_id: str, contact_data: dict) -> str:
     """Add a single emergency contact."""
     try:
-        await mongo_add_contact(user_id, contact_data)
+        await mongo_add_contact(user_id, _normalize_contact_payload(contact_data))
         return f"✅ Contact {contact_data['name']} added successfully!"
     except Exception as e:
         return f"❌ Failed to add contact: {str(e)}"
+    finally:
+        _contacts_cache.pop(user_id)
 
 async def list_contacts(user_id: str) -> str:
     """List all contacts for a user."""
     try:
-        contacts = await mongo_list_contacts(user_id)
+        contacts = await _cached_list_contacts(user_id)
         if not contacts:
             return "No emergency contacts found."
-        result = "📞 Your Emergency Contacts:\n"
-        for i, contact in enumerate(contacts, 1):
-            result += f"{i}. {contact['name']} ({contact['relation']}) - {contact['number']}\n"
-        return result
+        return "📞 Your Emergency Contacts:\n" + "".join(
+            f"{i}. {c['name']} ({c['relation']}) - {c['number']}\n" for i, c in enumerate(contacts, 1)
+        )
     except Exception as e:
         return f"❌ Error retrieving contacts: {str(e)}"
 
@@ -52,34 +86,69 @@ load_dotenv()
 try:
     import pywhatkit as kit
     WHATSAPP_AVAILABLE = True
-    print("WhatsApp integration available via pywhatkit")
+    log.info("WhatsApp integration available via pywhatkit")
 except ImportError:
     WHATSAPP_AVAILABLE = False
-    print("Warning: pywhatkit not available - WhatsApp sending will be simulated")
+    log.warning("pywhatkit not available - WhatsApp sending will be simulated")
+
+# WhatsApp Cloud API: one HTTPS request per alert, no browser needed
+WHATSAPP_TOKEN = os.getenv("WHATSAPP_TOKEN")
+WHATSAPP_PHONE_ID = os.getenv("WHATSAPP_PHONE_ID")
+WHATSAPP_API_URL = f"https://graph.facebook.com/v20.0/{WHATSAPP_PHONE_ID}/messages"
+# Force the pywhatkit path even when the Cloud API is configured
+USE_LEGACY_WHATSAPP = os.getenv("USE_LEGACY_WHATSAPP", "0") == "1"
+# Cloud API attempts per contact; 429/5xx replies and connection errors are retried
+SEND_ATTEMPTS = 3
+try:
+    import aiohttp
+    from tools.session import RETRY_STATUSES, get_session
+    WHATSAPP_API_AVAILABLE = bool(WHATSAPP_TOKEN and WHATSAPP_PHONE_ID) and not USE_LEGACY_WHATSAPP
+except ImportError:
+    WHATSAPP_API_AVAILABLE = False
+if WHATSAPP_API_AVAILABLE:
+    log.info("WhatsApp integration available via Cloud API")
+
+# Deletes every ASCII character except digits and '+'
+_NUMBER_DELETE = str.maketrans("", "", "".join(
+    chr(i) for i in range(128) if not (chr(i).isdigit() or chr(i) == "+")
+))
+
+# The same few contacts are rebuilt on every SOS and contact listing
+@lru_cache(maxsize=1024)
+def _normalize_phone(number: str) -> str:
+    """Normalize phone number to international format."""
+    # Stored numbers are already normalized; return them untouched
+    if number.startswith("+91") and number[3:].isdigit():
+        return number
+    # Remove all non-digit characters except +
+    if number.isascii():
+        clean = number.translate(_NUMBER_DELETE)
+    else:
+        clean = ''.join(c for c in number if c.isdigit() or c == '+')
+    
+    if clean.startswith("+91"):
+        return clean
+    if clean.startswith("91") and len(clean) > 10:
+        return f"+{clean}"
+    if len(clean) == 10:
+        return f"+91{clean}"
+    return clean if clean.startswith("+") else f"+91{clean}"
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Contact:
     name: str
     number: str
     relation: str
     
     def __post_init__(self):
-        self.number = self._normalize_number(self.number)
+        # Frozen: normalize through object.__setattr__ while constructing
+        object.__setattr__(self, "number", _normalize_phone(self.number))
     
     def _normalize_number(self, number: str) -> str:
         """Normalize phone number to international format."""
-        # Remove all non-digit characters except +
-        clean = ''.join(c for c in number if c.isdigit() or c == '+')
-        
-        if clean.startswith("+91"):
-            return clean
-        if clean.startswith("91") and len(clean) > 10:
-            return f"+{clean}"
-        if len(clean) == 10:
-            return f"+91{clean}"
-        return clean if clean.startswith("+") else f"+91{clean}"
-
-@dataclass
+        return _normalize_phone(number)
+
+@dataclass(slots=True)
 class SOSMessage:
     content: str
     location: Optional[str] = None
@@ -89,7 +158,7 @@ class SOSMessage:
         if not self.timestamp:
             self.timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-@dataclass
+@dataclass(slots=True)
 class SendResult:
     contact: str
     status: str
@@ -100,30 +169,59 @@ class ContactsRepository:
     """Local file fallback for contacts storage."""
     def __init__(self, file_path: str = "emergency_contacts.json"):
         self.file_path = file_path
+        # (file signature, contacts) from the last load; reused until the file changes
+        self._cached: Optional[tuple] = None
         # Ensure directory exists
         os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
     
     def load(self) -> List[Contact]:
         try:
-            if not os.path.exists(self.file_path):
+            try:
+                st = os.stat(self.file_path)
+            except FileNotFoundError:
                 return []
-            with open(self.file_path, 'r') as f:
-                data = json.load(f)
-                return [Contact(**contact) for contact in data]
+            signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if self._cached and self._cached[0] == signature:
+                return list(self._cached[1])
+            with open(self.file_path, 'rb') as f:
+                contacts = [Contact(**contact) for contact in orjson.loads(f.read())]
+            self._cached = (signature, contacts)
+            return list(contacts)
         except Exception as e:
-            print(f"Error loading contacts from file: {e}")
+            log.error("Error loading contacts from file: %s", e)
             return []
     
     def save(self, contacts: List[Contact]) -> None:
         try:
             data = [{'name': c.name, 'number': c.number, 'relation': c.relation} for c in contacts]
-            with open(self.file_path, 'w') as f:
-                json.dump(data, f, indent=2)
-            print(f"Saved {len(contacts)} contacts to {self.file_path}")
+            # Write a temp file and swap it in so a crash never leaves half a file
+            tmp_path = self.file_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+            os.replace(tmp_path, self.file_path)
+            self._cached = None
+            log.info("Saved %d contacts to %s", len(contacts), self.file_path)
         except Exception as e:
-            print(f"Error saving contacts to file: {e}")
+            log.error("Error saving contacts to file: %s", e)
             raise
 
+    async def load_async(self) -> List[Contact]:
+        """load() on a worker thread, keeping file I/O off the event loop."""
+        return await asyncio.to_thread(self.load)
+
+    async def save_async(self, contacts: List[Contact]) -> None:
+        """save() on a worker thread, keeping file I/O off the event loop."""
+        await asyncio.to_thread(self.save, contacts)
+
+# Message templates, filled once per trigger by MessageComposer.message_parts
+_ALERT_HEADER = "🚨 AUTOMATIC SOS ALERT 🚨\n\n{content}\n\n⏰ Time: {timestamp}\n"
+_LOCATION_LINE = "\n📍 Last Known Location: {location}"
+_ALERT_FOOTER = (
+    "\n🤖 AI Travel Guide Emergency System\n\n"
+    "⚠ This is an automated emergency alert. Please respond immediately or contact emergency services if needed."
+)
+_FALSE_ALARM_LINE = "\n\n🆘 If this is a false alarm, please confirm your safety."
+
 class MessageComposer:
     """Create SOS messages."""
     @staticmethod
@@ -133,22 +231,23 @@ class MessageComposer:
         return SOSMessage(content=content, location=location)
     
     @staticmethod
-    def format_whatsapp_message(sos_message: SOSMessage, contact: Contact) -> str:
-        msg = f"""🚨 AUTOMATIC SOS ALERT 🚨
-
-{sos_message.content}
+    def message_parts(sos_message: SOSMessage) -> tuple:
+        """The (prefix, suffix) shared by every contact's copy of one alert."""
+        fields = {"content": sos_message.content, "timestamp": sos_message.timestamp,
+                  "location": sos_message.location}
+        prefix = _ALERT_HEADER.format_map(fields)
+        suffix = _ALERT_FOOTER
+        if sos_message.location:
+            suffix += _LOCATION_LINE.format_map(fields)
+        return prefix, suffix + _FALSE_ALARM_LINE
 
-⏰ Time: {sos_message.timestamp}
-👤 Emergency Contact: {contact.name} ({contact.relation})
-🤖 AI Travel Guide Emergency System
+    @staticmethod
+    def format_whatsapp_message(sos_message: SOSMessage, contact: Contact, parts: Optional[tuple] = None) -> str:
+        prefix, suffix = parts or MessageComposer.message_parts(sos_message)
+        return f"{prefix}👤 Emergency Contact: {contact.name} ({contact.relation}){suffix}"
 
-⚠ This is an automated emergency alert. Please respond immediately or contact emergency services if needed."""
-        
-        if sos_message.location:
-            msg += f"\n📍 Last Known Location: {sos_message.location}"
-        
-        msg += "\n\n🆘 If this is a false alarm, please confirm your safety."
-        return msg
+# Held (process-wide, across event loops) for each pywhatkit browser send
+_BROWSER_LOCK = threading.Lock()
 
 class WhatsAppSender:
     """Send WhatsApp messages using pywhatkit."""
@@ -157,9 +256,7 @@ class WhatsAppSender:
         try:
             if not WHATSAPP_AVAILABLE:
                 # Simulate sending for testing
-                print(f"SIMULATED WhatsApp to {contact.name} ({contact.number}):")
-                print(f"Message: {message}")
-                print("-" * 50)
+                log.info("SIMULATED WhatsApp to %s (%s):\n%s", contact.name, contact.number, message)
                 return SendResult(
                     contact=contact.name, 
                     status="success", 
@@ -167,18 +264,20 @@ class WhatsAppSender:
                     error_message=None
                 )
             
-            print(f"Attempting to send WhatsApp to {contact.name} ({contact.number})")
+            log.info("Attempting to send WhatsApp to %s (%s)", contact.name, contact.number)
             
-            # Use pywhatkit to send immediately
-            kit.sendwhatmsg_instantly(
-                phone_no=contact.number,
-                message=message,
-                wait_time=15,  # Wait 15 seconds for WhatsApp to load
-                tab_close=True,
-                close_time=5   # Close tab after 5 seconds
-            )
+            # Use pywhatkit to send immediately; it types into whichever tab
+            # has focus, so only one send may drive the browser at a time
+            with _BROWSER_LOCK:
+                kit.sendwhatmsg_instantly(
+                    phone_no=contact.number,
+                    message=message,
+                    wait_time=15,  # Wait 15 seconds for WhatsApp to load
+                    tab_close=True,
+                    close_time=5   # Close tab after 5 seconds
+                )
             
-            print(f"WhatsApp sent successfully to {contact.name}")
+            log.info("WhatsApp sent successfully to %s", contact.name)
             return SendResult(
                 contact=contact.name, 
                 status="success", 
@@ -187,7 +286,7 @@ class WhatsAppSender:
             )
             
         except Exception as e:
-            print(f"Failed to send WhatsApp to {contact.name}: {str(e)}")
+            log.error("Failed to send WhatsApp to %s: %s", contact.name, e)
             return SendResult(
                 contact=contact.name, 
                 status="failed", 
@@ -195,6 +294,40 @@ class WhatsAppSender:
                 error_message=str(e)
             )
 
+class AsyncWhatsAppSender:
+    """Send WhatsApp messages through the WhatsApp Cloud API."""
+    @staticmethod
+    async def send(contact: Contact, message: str) -> SendResult:
+        payload = {
+            "messaging_product": "whatsapp",
+            "to": contact.number.lstrip("+"),
+            "type": "text",
+            "text": {"body": message},
+        }
+        headers = {"Authorization": f"Bearer {WHATSAPP_TOKEN}"}
+        error = None
+        for attempt in range(SEND_ATTEMPTS):
+            if attempt:
+                # Exponential backoff with jitter between retries of transient failures
+                await asyncio.sleep(min(30, 0.5 * 2 ** attempt) + random.random() * 0.25)
+            try:
+                session = await get_session()
+                async with session.post(WHATSAPP_API_URL, json=payload, headers=headers) as resp:
+                    if resp.status == 200:
+                        log.info("WhatsApp sent successfully to %s", contact.name)
+                        return SendResult(contact=contact.name, status="success", method="cloud_api")
+                    error = await resp.text()
+                    if resp.status not in RETRY_STATUSES:
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+            except Exception as e:
+                error = str(e)
+                break
+            log.warning("WhatsApp send to %s failed (attempt %d/%d): %s", contact.name, attempt + 1, SEND_ATTEMPTS, error)
+        log.error("Failed to send WhatsApp to %s: %s", contact.name, error)
+        return SendResult(contact=contact.name, status="failed", method="cloud_api", error_message=error)
+
 class SOSSystem:
     """Main SOS system coordinating contacts and messaging."""
     def __init__(self):
@@ -208,75 +341,88 @@ class SOSSystem:
             
             if user_id:
                 try:
-                    # Try to save to MongoDB
-                    for c in contacts:
-                        await mongo_add_contact(user_id, {
-                            "name": c.name, 
-                            "number": c.number, 
-                            "relation": c.relation
-                        })
-                    print(f"Saved contacts to MongoDB for user {user_id}")
+                    # Try to save to MongoDB in a single write
+                    await mongo_add_contacts_bulk(user_id, [
+                        {"name": c.name, "number": c.number, "relation": c.relation}
+                        for c in contacts
+                    ])
+                    _contacts_cache.pop(user_id)
+                    log.info("Saved contacts to MongoDB for user %s", user_id)
                     return "✅ Emergency contacts saved to your account!"
                 except Exception as e:
-                    print(f"MongoDB save failed: {e}, falling back to local storage")
+                    log.warning("MongoDB save failed: %s, falling back to local storage", e)
                     # Fallback to local storage
-                    self.contacts_repo.save(contacts)
+                    await self.contacts_repo.save_async(contacts)
                     return "✅ Emergency contacts saved locally (database unavailable)!"
             
             # Save locally if no user_id
-            self.contacts_repo.save(contacts)
+            await self.contacts_repo.save_async(contacts)
             return "✅ Emergency contacts saved locally!"
             
         except Exception as e:
-            print(f"Error saving contacts: {e}")
+            log.error("Error saving contacts: %s", e)
             return f"❌ Failed to save contacts: {str(e)}"
     
+    @staticmethod
+    async def _send(contact: Contact, message: str) -> SendResult:
+        """Send one alert via the Cloud API, or via pywhatkit on a worker thread.
+
+        Cloud API sends run concurrently; pywhatkit sends queue on _BROWSER_LOCK.
+        """
+        if WHATSAPP_API_AVAILABLE:
+            result = await AsyncWhatsAppSender.send(contact, message)
+            log.info("SOS sent to %s: %s", contact.name, result.status)
+            return result
+        try:
+            result = await asyncio.to_thread(WhatsAppSender.send, contact, message)
+            log.info("SOS sent to %s: %s", contact.name, result.status)
+            return result
+        except Exception as e:
+            log.exception("Error sending SOS to %s", contact.name)
+            return SendResult(contact.name, "failed", "error", str(e))
+
     async def trigger_sos(self, user_location: Optional[str] = None, user_message: Optional[str] = None, user_id: Optional[str] = None) -> str:
         """Trigger SOS to all saved contacts."""
-        print(f"Triggering SOS for user {user_id}")
+        log.info("Triggering SOS for user %s", user_id)
         contacts_list: List[Contact] = []
         
         # Try to get contacts from database first
         if user_id:
             try:
-                print(f"Fetching contacts from database for user {user_id}")
+                log.info("Fetching contacts from database for user %s", user_id)
                 records = await mongo_list_contacts(user_id)
                 if records:
                     contacts_list = [Contact(**r) for r in records]
-                    print(f"Found {len(contacts_list)} contacts in database")
+                    log.info("Found %d contacts in database", len(contacts_list))
                 else:
-                    print("No contacts found in database")
+                    log.info("No contacts found in database")
             except Exception as e:
-                print(f"Database error when fetching contacts: {e}")
+                log.warning("Database error when fetching contacts: %s", e)
         
         # Fallback to local file if no database contacts
         if not contacts_list:
-            print("Trying local file storage for contacts")
-            contacts_list = self.contacts_repo.load()
-            print(f"Found {len(contacts_list)} contacts in local storage")
+            log.info("Trying local file storage for contacts")
+            contacts_list = await self.contacts_repo.load_async()
+            log.info("Found %d contacts in local storage", len(contacts_list))
         
         if not contacts_list:
             error_msg = "❌ No emergency contacts found. Please add contacts first using the Setup SOS button."
-            print(error_msg)
+            log.warning(error_msg)
             return error_msg
         
         # Create SOS message
         sos_message = self.message_composer.create_sos_message(user_message, user_location)
         
-        # Send to all contacts
-        results = []
-        for contact in contacts_list:
-            try:
-                formatted_message = self.message_composer.format_whatsapp_message(sos_message, contact)
-                result = WhatsAppSender.send(contact, formatted_message)
-                results.append(result)
-                print(f"SOS sent to {contact.name}: {result.status}")
-            except Exception as e:
-                print(f"Error sending SOS to {contact.name}: {e}")
-                results.append(SendResult(contact.name, "failed", "error", str(e)))
+        # Cloud API sends go out concurrently; pywhatkit sends (~20s each) take
+        # the browser one at a time
+        parts = self.message_composer.message_parts(sos_message)
+        results = await asyncio.gather(*(
+            self._send(contact, self.message_composer.format_whatsapp_message(sos_message, contact, parts))
+            for contact in contacts_list
+        ))
         
         # Format response
-        success_count = sum(1 for r in results if r.status == "success")
+        success_count = sum(r.status == "success" for r in results)
         total_count = len(results)
         
         if success_count == 0:
@@ -284,4 +430,34 @@ class SOSSystem:
         elif success_count == total_count:
             return f"✅ SOS alert sent successfully to all {total_count} emergency contacts!"
         else:
-            return f"⚠️ SOS alert sent to {success_count} out of {total_count} contacts. Some messages may have failed."
\ No newline at end of file
+            return f"⚠️ SOS alert sent to {success_count} out of {total_count} contacts. Some messages may have failed."
+# ------------------------
+# CLI workflow
+# ------------------------
+async def _ainput(prompt: str) -> str:
+    """input() on a worker thread, so the event loop keeps running while the user types."""
+    return (await asyncio.to_thread(input, prompt)).strip()
+
+async def handle_sos_workflow(user_id: str, interactive: bool = False,
+                              user_location: Optional[str] = None, user_message: Optional[str] = None) -> str:
+    """Trigger SOS, first asking for two contacts in interactive mode if none are saved."""
+    sos_system = SOSSystem()
+    try:
+        has_contacts = bool(await _cached_list_contacts(user_id))
+    except Exception as e:
+        log.warning("Database error when fetching contacts: %s", e)
+        has_contacts = False
+    if not has_contacts:
+        has_contacts = bool(await sos_system.contacts_repo.load_async())
+
+    if not has_contacts and interactive:
+        print("No emergency contacts found. Please add two contacts.")
+        contacts = []
+        for n in (1, 2):
+            name = await _ainput(f"Contact {n} name: ")
+            number = await _ainput(f"Contact {n} phone number: ")
+            relation = await _ainput(f"Contact {n} relation: ") or "family"
+            contacts.append({"name": name, "number": number, "relation": relation})
+        print(await sos_system.save_contacts(contacts[0], contacts[1], user_id=user_id))
+
+    return await sos_system.trigger_sos(user_location, user_message, user_id)
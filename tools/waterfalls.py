@@ -0,0 +1,36 @@
+# tools/waterfalls.py
+from functools import lru_cache
+
+# Waterfall Safety Data
+SAFE_WATERFALLS = {
+    "kerala": [{"name": "Athirappilly Falls", "safety_level": "SAFE", "features": ["Well-maintained viewing areas", "Tourist management"], "best_time": "8:00 AM - 10:00 AM", "current_status": "Safe for viewing", "bathing": "Shallow areas only"}],
+    "tamil nadu": [{"name": "Courtallam Falls", "safety_level": "SAFE", "features": ["Shallow bathing pools", "Lifeguard presence"], "best_time": "7:00 AM - 9:00 AM", "current_status": "Excellent for families", "bathing": "Multiple safe areas"}],
+    "karnataka": [{"name": "Jog Falls", "safety_level": "SAFE", "features": ["Viewing platforms", "Tourist infrastructure"], "best_time": "8:00 AM - 10:00 AM", "current_status": "Safe for viewing", "bathing": "Viewing only"}],
+    "goa": [{"name": "Dudhsagar Falls", "safety_level": "MODERATE", "features": ["Natural pools", "Trekking required"], "best_time": "8:00 AM - 10:00 AM", "current_status": "Safe with precautions", "bathing": "Exercise caution"}]
+}
+
+_DEFAULT_WATERFALL = {"name": "Local Safe Waterfall", "safety_level": "SAFE", "features": ["Tourist-friendly"], "best_time": "8:00 AM - 10:00 AM", "current_status": "Safe for viewing", "bathing": "Check conditions"}
+
+@lru_cache(maxsize=1024)
+def get_safest_waterfall(location):
+    location_lower = location.lower()
+    # Usually the location is the state itself
+    waterfalls = SAFE_WATERFALLS.get(location_lower.strip())
+    if waterfalls:
+        return waterfalls[0]
+    for state, waterfalls in SAFE_WATERFALLS.items():
+        if state in location_lower:
+            return waterfalls[0]
+    return _DEFAULT_WATERFALL
+
+def format_waterfall_safety(waterfall_data):
+    return f"**{waterfall_data['name']}** 🌊\n- Safety Status: {waterfall_data['safety_level']} - {waterfall_data['current_status']}\n- Best Time: {waterfall_data['best_time']}\n- Bathing: {waterfall_data['bathing']}\n- Duration: 2-3 hours"
+
+# Safety text for every known waterfall, formatted once at import
+_SAFETY_TEXT = {
+    waterfall["name"]: format_waterfall_safety(waterfall)
+    for waterfall in [*(waterfalls[0] for waterfalls in SAFE_WATERFALLS.values()), _DEFAULT_WATERFALL]
+}
+
+def waterfall_safety_text(waterfall_data):
+    return _SAFETY_TEXT.get(waterfall_data["name"]) or format_waterfall_safety(waterfall_data)
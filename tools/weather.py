@@ -1,12 +1,31 @@
 import os
-import aiohttp
 import asyncio
+import time
+import aiohttp
 from dotenv import load_dotenv
+from tools.cache import ttl_cache
+from tools.session import LOOKUP_TIMEOUT, get_json
 
 load_dotenv()
 
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
+_STATUS_ERRORS = {
+    404: "❌ Location '{location}' not found. Check spelling and try again.",
+    401: "❌ Weather service authentication failed",
+}
+
+# Circuit breaker: after BREAKER_THRESHOLD consecutive upstream failures, skip
+# OpenWeatherMap for BREAKER_COOLDOWN seconds instead of waiting on timeouts
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60
+_breaker = {"failures": 0, "opened_at": 0.0}
 
+def _record_failure():
+    _breaker["failures"] += 1
+    _breaker["opened_at"] = time.monotonic()
+
+# Current conditions go stale quickly, so keep them for 10 minutes only
+@ttl_cache(ttl=600, maxsize=512, persist=True)
 async def get_weather(location: str) -> str:
     """Get current weather data for Indian travelers using OpenWeatherMap API."""
     
@@ -16,49 +35,56 @@ async def get_weather(location: str) -> str:
     url = "http://api.openweathermap.org/data/2.5/weather"
     params = {"q": location, "appid": OPENWEATHER_API_KEY, "units": "metric"}
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params, timeout=10) as response:
-            if response.status == 404:
-                return f"❌ Location '{location}' not found. Check spelling and try again."
-            elif response.status == 401:
-                return "❌ Weather service authentication failed"
-            elif response.status != 200:
-                return f"❌ Weather service error: {response.status}"
+    if _breaker["failures"] >= BREAKER_THRESHOLD and time.monotonic() - _breaker["opened_at"] < BREAKER_COOLDOWN:
+        return "❌ Weather service temporarily unavailable. Please try again in a minute."
+
+    # Transient errors are retried inside get_json before they count as a failure
+    try:
+        status, data = await get_json("GET", url, params=params, timeout=LOOKUP_TIMEOUT)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        _record_failure()
+        raise
+    if status >= 500 or status == 429:
+        _record_failure()
+    else:
+        _breaker["failures"] = 0
 
-            data = await response.json()
+    if status != 200 or data is None:
+        message = _STATUS_ERRORS.get(status, "❌ Weather service error: {status}")
+        return message.format(location=location, status=status)
 
-            if data.get("cod") != 200:
-                return f"❌ Weather data unavailable for '{location}'"
+    if data.get("cod") != 200:
+        return f"❌ Weather data unavailable for '{location}'"
 
-            # Extract weather data
-            city = data["name"]
-            country = data["sys"]["country"]
-            temp = round(data["main"]["temp"], 1)
-            weather_desc = data["weather"][0]["description"].title()
-            feels_like = round(data["main"]["feels_like"], 1)
-            humidity = data["main"]["humidity"]
-            wind_speed = data.get("wind", {}).get("speed", 0)
+    # Extract weather data
+    city = data["name"]
+    country = data["sys"]["country"]
+    temp = round(data["main"]["temp"], 1)
+    weather_desc = data["weather"][0]["description"].title()
+    feels_like = round(data["main"]["feels_like"], 1)
+    humidity = data["main"]["humidity"]
+    wind_speed = data.get("wind", {}).get("speed", 0)
 
-            # Travel advice for Indian travelers
-            travel_advice = ""
-            if temp > 35:
-                travel_advice = "\n🔥 **Travel Tip:** Very hot! Carry water, wear sunscreen, avoid midday travel."
-            elif temp < 10:
-                travel_advice = "\n🧥 **Travel Tip:** Cold weather! Pack warm clothes and layers."
-            elif humidity > 80:
-                travel_advice = "\n💧 **Travel Tip:** High humidity! Light, breathable cotton clothing recommended."
-            elif wind_speed > 10:
-                travel_advice = "\n💨 **Travel Tip:** Windy conditions! Secure loose items and be cautious outdoors."
+    # Travel advice for Indian travelers
+    travel_advice = ""
+    if temp > 35:
+        travel_advice = "\n🔥 **Travel Tip:** Very hot! Carry water, wear sunscreen, avoid midday travel."
+    elif temp < 10:
+        travel_advice = "\n🧥 **Travel Tip:** Cold weather! Pack warm clothes and layers."
+    elif humidity > 80:
+        travel_advice = "\n💧 **Travel Tip:** High humidity! Light, breathable cotton clothing recommended."
+    elif wind_speed > 10:
+        travel_advice = "\n💨 **Travel Tip:** Windy conditions! Secure loose items and be cautious outdoors."
 
-            result = f"🌍 **Live Weather in {city}, {country}:**\n\n"
-            result += f"🌡️ **Temperature:** {temp}°C (Feels like {feels_like}°C)\n"
-            result += f"☁️ **Condition:** {weather_desc}\n"
-            result += f"💧 **Humidity:** {humidity}%\n"
-            result += f"💨 **Wind Speed:** {wind_speed} m/s"
-            result += travel_advice
-            result += f"\n\n🇮🇳 **For Indian Travelers:** Perfect weather data to plan your trip timing!"
+    result = f"🌍 **Live Weather in {city}, {country}:**\n\n"
+    result += f"🌡️ **Temperature:** {temp}°C (Feels like {feels_like}°C)\n"
+    result += f"☁️ **Condition:** {weather_desc}\n"
+    result += f"💧 **Humidity:** {humidity}%\n"
+    result += f"💨 **Wind Speed:** {wind_speed} m/s"
+    result += travel_advice
+    result += f"\n\n🇮🇳 **For Indian Travelers:** Perfect weather data to plan your trip timing!"
 
-            return result
+    return result
 
 if __name__ == "__main__":
     location = input("Enter city name: ")
@@ -1,6 +1,7 @@
 import asyncio
 import difflib
 import re
+from functools import lru_cache, wraps
 from typing import Annotated, TypedDict, List, Optional, Tuple
 
 from langgraph.graph import StateGraph, START, END, add_messages
@@ -10,7 +11,6 @@ from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, Base
 from langchain_core.tools import tool
 from dotenv import load_dotenv
 import os
-import aiohttp
 
 # Import tools
 from tools.weather import get_weather
@@ -19,6 +19,8 @@ from tools.maps import get_maps
 from tools.booking import get_booking
 from tools.images import get_images
 from tools.news import get_news
+from tools.cache import ttl_cache
+from tools.session import LOOKUP_TIMEOUT, get_json, run_sync
 try:
     from tools.sos import SOSSystem
 except ImportError:
@@ -28,29 +30,16 @@ except ImportError:
 from tool_integration import tool_integrator, integrate_tools_for_trip_planning, format_psychology_aware_response
 
 from prompts.prompts import get_trip_agent_prompt
+from tools.waterfalls import get_safest_waterfall, waterfall_safety_text
 
-# Waterfall Safety Data
-SAFE_WATERFALLS = {
-    "kerala": [{"name": "Athirappilly Falls", "safety_level": "SAFE", "features": ["Well-maintained viewing areas", "Tourist management"], "best_time": "8:00 AM - 10:00 AM", "current_status": "Safe for viewing", "bathing": "Shallow areas only"}],
-    "tamil nadu": [{"name": "Courtallam Falls", "safety_level": "SAFE", "features": ["Shallow bathing pools", "Lifeguard presence"], "best_time": "7:00 AM - 9:00 AM", "current_status": "Excellent for families", "bathing": "Multiple safe areas"}],
-    "karnataka": [{"name": "Jog Falls", "safety_level": "SAFE", "features": ["Viewing platforms", "Tourist infrastructure"], "best_time": "8:00 AM - 10:00 AM", "current_status": "Safe for viewing", "bathing": "Viewing only"}],
-    "goa": [{"name": "Dudhsagar Falls", "safety_level": "MODERATE", "features": ["Natural pools", "Trekking required"], "best_time": "8:00 AM - 10:00 AM", "current_status": "Safe with precautions", "bathing": "Exercise caution"}]
-}
-
-def get_safest_waterfall(location):
-    location_lower = location.lower()
-    for state, waterfalls in SAFE_WATERFALLS.items():
-        if state in location_lower:
-            return waterfalls[0]
-    return {"name": "Local Safe Waterfall", "safety_level": "SAFE", "features": ["Tourist-friendly"], "best_time": "8:00 AM - 10:00 AM", "current_status": "Safe for viewing", "bathing": "Check conditions"}
-
-def format_waterfall_safety(waterfall_data):
-    return f"**{waterfall_data['name']}** 🌊\n- Safety Status: {waterfall_data['safety_level']} - {waterfall_data['current_status']}\n- Best Time: {waterfall_data['best_time']}\n- Bathing: {waterfall_data['bathing']}\n- Duration: 2-3 hours"
 load_dotenv()
 
 class State(TypedDict):
     messages: Annotated[List[BaseMessage], add_messages]
 
+# The system prompt is static; one message object serves every turn
+_SYS_MSG = SystemMessage(content=get_trip_agent_prompt())
+
 # LLM setup
 llm = ChatGroq(
     api_key=os.getenv("GROQ_API_KEY"),
@@ -59,7 +48,7 @@ llm = ChatGroq(
 )
 
 # Destination list for spell checking
-DESTINATIONS = [
+DESTINATIONS = (
     "mumbai", "delhi", "bangalore", "hyderabad", "chennai", "kolkata", "pune", "ahmedabad",
     "jaipur", "lucknow", "kanpur", "nagpur", "indore", "bhopal", "visakhapatnam", "patna",
     "goa", "kerala", "rajasthan", "himachal pradesh", "uttarakhand", "kashmir", "ladakh",
@@ -69,20 +58,42 @@ DESTINATIONS = [
     "mysore", "coorg", "ooty", "kodaikanal", "pondicherry", "hampi", "badami",
     "paris", "london", "dubai", "singapore", "thailand", "malaysia", "japan", "switzerland",
     "new york", "toronto", "sydney", "bali", "maldives", "nepal", "bhutan", "sri lanka"
-]
+)
+DESTINATION_SET = frozenset(DESTINATIONS)
 
-def smart_spell_check_location(location: str, confidence_threshold: float = 0.8) -> tuple[str, bool, bool]:
-    """
-    Smart spell checking that auto-corrects high confidence matches.
-    Returns: (corrected_location, was_corrected, needs_confirmation)
-    """
-    location_lower = location.lower().strip()
-    matches = difflib.get_close_matches(location_lower, DESTINATIONS, n=1, cutoff=0.6)
-    
-    if matches:
-        match = matches[0]
-        similarity = difflib.SequenceMatcher(None, location_lower, match).ratio()
-        
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:
+    process = None
+
+def _closest_destination(location_lower: str) -> tuple[Optional[str], float]:
+    """Best destination match scoring at least 0.6, with its similarity (0-1)."""
+    if location_lower in DESTINATION_SET:
+        return location_lower, 1.0
+    if process is not None:
+        found = process.extractOne(location_lower, DESTINATIONS, scorer=fuzz.ratio, score_cutoff=60)
+        return (found[0], found[1] / 100) if found else (None, 0.0)
+    # difflib fallback: one matcher scores every candidate, and the cheap
+    # upper bounds skip any that cannot beat the best so far
+    matcher = difflib.SequenceMatcher()
+    matcher.set_seq2(location_lower)
+    best, best_score = None, 0.6
+    for dest in DESTINATIONS:
+        matcher.set_seq1(dest)
+        if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+            continue
+        score = matcher.ratio()
+        # Ties go to the larger string, as in difflib.get_close_matches
+        if score > best_score or (score == best_score and (best is None or dest > best)):
+            best, best_score = dest, score
+    return (best, best_score) if best else (None, 0.0)
+
+# Every tool in a turn re-checks the same location, so results are memoized
+@lru_cache(maxsize=2048)
+def _spell_check(location_lower: str, confidence_threshold: float) -> tuple[Optional[str], bool, bool]:
+    match, similarity = _closest_destination(location_lower)
+    
+    if match:
         if similarity >= confidence_threshold:
             # High confidence - auto-correct without asking
             return match.title(), True, False
@@ -90,66 +101,128 @@ def smart_spell_check_location(location: str, confidence_threshold: float = 0.8)
             # Medium confidence - suggest correction
             return match.title(), True, True
         
-    return location, False, False
+    return None, False, False
+
+def smart_spell_check_location(location: str, confidence_threshold: float = 0.8) -> tuple[str, bool, bool]:
+    """
+    Smart spell checking that auto-corrects high confidence matches.
+    Returns: (corrected_location, was_corrected, needs_confirmation)
+    """
+    match, was_corrected, needs_confirmation = _spell_check(location.lower().strip(), confidence_threshold)
+    return (match or location), was_corrected, needs_confirmation
 
 # ----------------------------
 # Reverse geocoding helper
 # ----------------------------
+# Centroids of major Indian cities; coordinates within ~0.1° (~11 km) of one
+# are labelled without asking Nominatim
+CITY_CENTROIDS = {
+    "Mumbai": (19.076, 72.878), "Delhi": (28.614, 77.209), "Bengaluru": (12.972, 77.595),
+    "Hyderabad": (17.385, 78.487), "Chennai": (13.083, 80.271), "Kolkata": (22.573, 88.364),
+    "Pune": (18.520, 73.857), "Ahmedabad": (23.023, 72.571), "Jaipur": (26.912, 75.787),
+    "Lucknow": (26.847, 80.946), "Kanpur": (26.449, 80.331), "Nagpur": (21.146, 79.088),
+    "Indore": (22.720, 75.858), "Bhopal": (23.260, 77.413), "Visakhapatnam": (17.687, 83.218),
+    "Patna": (25.594, 85.138), "Vadodara": (22.307, 73.181), "Surat": (21.170, 72.831),
+    "Chandigarh": (30.734, 76.779), "Kochi": (9.931, 76.267), "Thiruvananthapuram": (8.524, 76.936),
+    "Coimbatore": (11.017, 76.956), "Madurai": (9.925, 78.120), "Mysuru": (12.296, 76.639),
+    "Varanasi": (25.318, 82.974), "Agra": (27.177, 78.008), "Amritsar": (31.634, 74.872),
+    "Guwahati": (26.144, 91.736), "Bhubaneswar": (20.296, 85.825), "Dehradun": (30.317, 78.032),
+    "Shimla": (31.105, 77.173), "Udaipur": (24.585, 73.712), "Jodhpur": (26.238, 73.024),
+    "Srinagar": (34.084, 74.797), "Puducherry": (11.934, 79.830), "Panaji": (15.491, 73.828),
+}
+
+def _build_city_grid() -> dict:
+    """(lat, lon) rounded to 0.1° -> "City, India" for each centroid's 3x3 block."""
+    grid = {}
+    for city, (lat, lon) in CITY_CENTROIDS.items():
+        grid[round(lat, 1), round(lon, 1)] = f"{city}, India"
+    # Neighbouring cells never override a city's own centroid cell
+    for city, (lat, lon) in CITY_CENTROIDS.items():
+        for dlat in (-0.1, 0.0, 0.1):
+            for dlon in (-0.1, 0.0, 0.1):
+                grid.setdefault((round(lat + dlat, 1), round(lon + dlon, 1)), f"{city}, India")
+    return grid
+
+_CITY_GRID = _build_city_grid()
+
 async def reverse_geocode(lat: float, lon: float) -> Optional[str]:
     """Convert coordinates to location name using Nominatim."""
+    city = _CITY_GRID.get((round(lat, 1), round(lon, 1)))
+    if city:
+        return city
+    # 3 decimals is ~100 m, far finer than the zoom=10 city label
+    return await _reverse_geocode_cached(round(lat, 3), round(lon, 3))
+
+@ttl_cache(ttl=86400, maxsize=1024)
+async def _reverse_geocode_cached(lat: float, lon: float) -> Optional[str]:
     url = "https://nominatim.openstreetmap.org/reverse"
     params = {"lat": lat, "lon": lon, "format": "json", "zoom": 10, "addressdetails": 1}
     headers = {"User-Agent": "IndianTravelApp/1.0", "Accept-Language": "en"}
     
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params, headers=headers, timeout=10) as resp:
-            if resp.status != 200:
-                return None
-            data = await resp.json()
-            addr = data.get("address", {})
-            city = (addr.get("city") or addr.get("town") or 
-                   addr.get("village") or addr.get("state_district") or addr.get("state"))
-            country = addr.get("country")
-            return f"{city}, {country}" if (city and country) else data.get("display_name")
+    status, data = await get_json("GET", url, params=params, headers=headers, timeout=LOOKUP_TIMEOUT)
+    if status != 200 or not data:
+        return None
+    addr = data.get("address", {})
+    city = (addr.get("city") or addr.get("town") or 
+           addr.get("village") or addr.get("state_district") or addr.get("state"))
+    country = addr.get("country")
+    return f"{city}, {country}" if (city and country) else data.get("display_name")
 
 # ----------------------------
 # Tools - Now more conversational
 # ----------------------------
+# Network-bound tools are async so ToolNode awaits parallel tool calls on the
+# caller's loop (GRAPH.ainvoke/astream); the sync entry point keeps plain
+# tool.invoke working for scripts.
+def _sync_entry(async_tool):
+    """Let an async @tool also be invoked synchronously, on the shared tool loop."""
+    coroutine = async_tool.coroutine
+
+    @wraps(coroutine)
+    def func(*args, **kwargs):
+        return run_sync(coroutine(*args, **kwargs))
+
+    async_tool.func = func
+    return async_tool
+
+@_sync_entry
 @tool
-def WeatherTool(location: str) -> str:
+async def WeatherTool(location: str) -> str:
     """Get current weather and forecast for any location."""
     corrected_location, was_corrected, needs_confirmation = smart_spell_check_location(location)
     
     if needs_confirmation:
-        return f"🔍 Did you mean '{corrected_location}'? Let me check weather there anyway.\n\n" + asyncio.run(get_weather(corrected_location))
+        return f"🔍 Did you mean '{corrected_location}'? Let me check weather there anyway.\n\n" + await get_weather(corrected_location)
     
     # Use corrected location if auto-corrected, or original if no correction needed
     final_location = corrected_location if was_corrected else location
-    result = asyncio.run(get_weather(final_location))
+    result = await get_weather(final_location)
     
     if was_corrected and not needs_confirmation:
         return f"📍 Showing weather for {corrected_location}:\n\n{result}"
     
     return result
 
+@_sync_entry
 @tool
-def PlacesTool(location: str, place_type: str = "tourism") -> str:
+async def PlacesTool(location: str, place_type: str = "tourism") -> str:
     """Find tourism attractions, restaurants, or hotels with details."""
     corrected_location, was_corrected, needs_confirmation = smart_spell_check_location(location)
     
     if needs_confirmation:
-        return f"🔍 Did you mean '{corrected_location}'? Let me show places there anyway.\n\n" + asyncio.run(get_places(corrected_location, place_type))
+        return f"🔍 Did you mean '{corrected_location}'? Let me show places there anyway.\n\n" + await get_places(corrected_location, place_type)
     
     final_location = corrected_location if was_corrected else location
-    result = asyncio.run(get_places(final_location, place_type))
+    result = await get_places(final_location, place_type)
     
     if was_corrected and not needs_confirmation:
         return f"📍 Showing places in {corrected_location}:\n\n{result}"
     
     return result
 
+@_sync_entry
 @tool
-def MapsTool(query: str) -> str:
+async def MapsTool(query: str) -> str:
     """Get directions between locations. Use format 'Delhi to Agra'."""
     query_lower = query.lower().strip()
     
@@ -170,68 +243,70 @@ def MapsTool(query: str) -> str:
     # If either needs confirmation, ask but still try to provide directions
     if origin_needs_confirm or dest_needs_confirm:
         confirm_msg = f"🔍 Did you mean '{corrected_origin}' to '{corrected_dest}'? Let me get directions anyway.\n\n"
-        return confirm_msg + asyncio.run(get_maps(corrected_origin, corrected_dest))
+        return confirm_msg + await get_maps(corrected_origin, corrected_dest)
     
     # Use corrected locations if available
     final_origin = corrected_origin if origin_corrected else origin
     final_dest = corrected_dest if dest_corrected else destination
     
-    result = asyncio.run(get_maps(final_origin, final_dest))
+    result = await get_maps(final_origin, final_dest)
     
     if (origin_corrected and not origin_needs_confirm) or (dest_corrected and not dest_needs_confirm):
         return f"📍 Directions from {final_origin} to {final_dest}:\n\n{result}"
     
     return result
 
+@_sync_entry
 @tool
-def BookingTool(location: str, place_name: str = "", place_type: str = "hotel") -> str:
+async def BookingTool(location: str, place_name: str = "", place_type: str = "hotel") -> str:
     """Find hotels/restaurants with booking info and contact details."""
     corrected_location, was_corrected, needs_confirmation = smart_spell_check_location(location)
     
     if needs_confirmation:
-        return f"🔍 Did you mean '{corrected_location}'? Let me find {place_type}s there anyway.\n\n" + asyncio.run(get_booking(corrected_location, place_name, place_type))
+        return f"🔍 Did you mean '{corrected_location}'? Let me find {place_type}s there anyway.\n\n" + await get_booking(corrected_location, place_name, place_type)
     
     final_location = corrected_location if was_corrected else location
-    result = asyncio.run(get_booking(final_location, place_name, place_type))
+    result = await get_booking(final_location, place_name, place_type)
     
     if was_corrected and not needs_confirmation:
         return f"📍 Finding {place_type}s in {corrected_location}:\n\n{result}"
     
     return result
 
+# Link labels get_images may use, normalized in one pass
+_IMG_LABEL_RE = re.compile(r"\[(?:See Here|View Here|Check Photo|Look Here|View Picture)\]")
+
+@_sync_entry
 @tool
-def ImagesTool(location: str) -> str:
+async def ImagesTool(location: str) -> str:
     """Get recent images with clickable links for a location."""
     corrected_location, was_corrected, needs_confirmation = smart_spell_check_location(location)
     
     if needs_confirmation:
-        return f"🔍 Did you mean '{corrected_location}'? Let me find images anyway.\n\n" + asyncio.run(get_images(corrected_location))
+        return f"🔍 Did you mean '{corrected_location}'? Let me find images anyway.\n\n" + await get_images(corrected_location)
     
     final_location = corrected_location if was_corrected else location
-    result = asyncio.run(get_images(final_location))
+    result = await get_images(final_location)
     
     # Ensure clickable links are properly formatted
-    result = result.replace("[See Here]", "[🔗 See Images]")
-    result = result.replace("[View Here]", "[🔗 See Images]")
-    result = result.replace("[Check Photo]", "[🔗 See Images]")
-    result = result.replace("[Look Here]", "[🔗 See Images]")
-    result = result.replace("[View Picture]", "[🔗 See Images]")
+    result = _IMG_LABEL_RE.sub("[🔗 See Images]", result)
     
     if was_corrected and not needs_confirmation:
         return f"📍 Images of {corrected_location}:\n\n{result}"
     
     return result
 
+@_sync_entry
 @tool
-def NewsTool(location: str) -> str:
+async def NewsTool(location: str) -> str:
     """Get recent news and updates about a destination."""
     corrected_location, was_corrected, needs_confirmation = smart_spell_check_location(location)
     
     if needs_confirmation:
-        return f"🔍 Did you mean '{corrected_location}'? Let me get news anyway.\n\n" + asyncio.run(get_news(corrected_location))
+        return f"🔍 Did you mean '{corrected_location}'? Let me get news anyway.\n\n" + await get_news(corrected_location)
     
     final_location = corrected_location if was_corrected else location
-    result = asyncio.run(get_news(final_location))
+    result = await get_news(final_location)
     
     if was_corrected and not needs_confirmation:
         return f"📍 News about {corrected_location}:\n\n{result}"
@@ -239,35 +314,67 @@ def NewsTool(location: str) -> str:
     return result
 
 # Budget/Itinerary/Tips/Alerts tools remain the same but with smart spell checking
+# Per-day costs (₹) by traveler category, scaled by destination
+BUDGET_DATA = {
+    "budget": {"accommodation": 800, "food": 500, "transport": 300, "activities": 400},
+    "mid-range": {"accommodation": 2500, "food": 1200, "transport": 800, "activities": 1000},
+    "luxury": {"accommodation": 8000, "food": 3000, "transport": 2000, "activities": 2500}
+}
+
+COST_MULTIPLIERS = {
+    "goa": 1.2, "mumbai": 1.5, "delhi": 1.3, "kerala": 1.1, "rajasthan": 1.0,
+    "himachal pradesh": 1.3, "dubai": 3.0, "singapore": 2.8, "thailand": 0.8
+}
+
+# (category, destination) -> per-day accommodation, food, transport,
+# activities and total; "" is any destination without a multiplier
+_DAILY_COSTS = {
+    (category, destination): (
+        int(costs["accommodation"] * multiplier), int(costs["food"] * multiplier),
+        int(costs["transport"] * multiplier), int(costs["activities"] * multiplier),
+        sum(costs.values()) * multiplier,
+    )
+    for category, costs in BUDGET_DATA.items()
+    for destination, multiplier in [("", 1.0), *COST_MULTIPLIERS.items()]
+}
+
+DESTINATION_ACTIVITIES = {
+    "goa": ["Beach hopping & water sports", "Old Goa churches & heritage", "Night markets & local cuisine"],
+    "kerala": ["Kochi & Chinese nets", "Munnar tea gardens", "Alleppey backwaters"],
+    "rajasthan": ["City Palace & Hawa Mahal", "Amber Fort & local markets", "Cultural shows & cuisine"],
+    "himachal pradesh": ["Local sightseeing & temples", "Adventure activities", "Mountain views & photography"]
+}
+_DEFAULT_ACTIVITIES = ["Local sightseeing", "Cultural exploration", "Relaxation"]
+
+DESTINATION_TIPS = {
+    "goa": {"best_time": "Nov-Mar", "tip": "Rent scooter for easy travel, try fresh seafood, respect beach rules"},
+    "kerala": {"best_time": "Oct-Mar", "tip": "Experience houseboat stays, try local cuisine, follow temple etiquette"},
+    "rajasthan": {"best_time": "Oct-Mar", "tip": "Stay hydrated, bargain in local markets, consider heritage hotels"},
+    "himachal pradesh": {"best_time": "Apr-Jun", "tip": "Carry warm clothes, book accommodations in advance, follow mountain safety"}
+}
+_DEFAULT_TIPS = {"best_time": "Research climate", "tip": "Respect local culture and customs"}
+
 @tool
 def BudgetTool(destination: str, days: int = 3, traveler_type: str = "budget") -> str:
     """Calculate budget for Indian travelers with accommodation, food, transport, activities."""
     corrected_location, was_corrected, needs_confirmation = smart_spell_check_location(destination)
     final_destination = corrected_location if was_corrected else destination
     
-    budget_data = {
-        "budget": {"accommodation": 800, "food": 500, "transport": 300, "activities": 400},
-        "mid-range": {"accommodation": 2500, "food": 1200, "transport": 800, "activities": 1000},
-        "luxury": {"accommodation": 8000, "food": 3000, "transport": 2000, "activities": 2500}
-    }
-    
-    multipliers = {
-        "goa": 1.2, "mumbai": 1.5, "delhi": 1.3, "kerala": 1.1, "rajasthan": 1.0,
-        "himachal pradesh": 1.3, "dubai": 3.0, "singapore": 2.8, "thailand": 0.8
-    }
-    
-    base_costs = budget_data.get(traveler_type.lower(), budget_data["budget"])
-    multiplier = multipliers.get(final_destination.lower(), 1.0)
-    daily_cost = sum(base_costs.values()) * multiplier
+    category = traveler_type.lower()
+    if category not in BUDGET_DATA:
+        category = "budget"
+    accommodation, food, transport, activities, daily_cost = (
+        _DAILY_COSTS.get((category, final_destination.lower())) or _DAILY_COSTS[category, ""]
+    )
     total_cost = daily_cost * days
     
     result = f"""💰 **Budget for {final_destination.title()} ({days} days)**
 
 **{traveler_type.title()} Category:**
-🏨 Accommodation: ₹{int(base_costs['accommodation'] * multiplier):,} per day
-🍛 Food: ₹{int(base_costs['food'] * multiplier):,} per day
-🚗 Transport: ₹{int(base_costs['transport'] * multiplier):,} per day
-🎫 Activities: ₹{int(base_costs['activities'] * multiplier):,} per day
+🏨 Accommodation: ₹{accommodation:,} per day
+🍛 Food: ₹{food:,} per day
+🚗 Transport: ₹{transport:,} per day
+🎫 Activities: ₹{activities:,} per day
 
 **Total per day: ₹{int(daily_cost):,}**
 **{days}-day trip total: ₹{int(total_cost):,}**
@@ -291,14 +398,7 @@ def ItineraryTool(destination: str, days: int = 3) -> str:
     corrected_location, was_corrected, needs_confirmation = smart_spell_check_location(destination)
     final_destination = corrected_location if was_corrected else destination
     
-    activities = {
-        "goa": ["Beach hopping & water sports", "Old Goa churches & heritage", "Night markets & local cuisine"],
-        "kerala": ["Kochi & Chinese nets", "Munnar tea gardens", "Alleppey backwaters"],
-        "rajasthan": ["City Palace & Hawa Mahal", "Amber Fort & local markets", "Cultural shows & cuisine"],
-        "himachal pradesh": ["Local sightseeing & temples", "Adventure activities", "Mountain views & photography"]
-    }
-    
-    dest_activities = activities.get(final_destination.lower(), ["Local sightseeing", "Cultural exploration", "Relaxation"])
+    dest_activities = DESTINATION_ACTIVITIES.get(final_destination.lower(), _DEFAULT_ACTIVITIES)
     
     result = f"📋 **{days}-Day Itinerary for {final_destination.title()}**\n\n"
     for day in range(1, min(days + 1, 4)):
@@ -326,14 +426,7 @@ def TravelTipsTool(destination: str) -> str:
     corrected_location, was_corrected, needs_confirmation = smart_spell_check_location(destination)
     final_destination = corrected_location if was_corrected else destination
     
-    tips = {
-        "goa": {"best_time": "Nov-Mar", "tip": "Rent scooter for easy travel, try fresh seafood, respect beach rules"},
-        "kerala": {"best_time": "Oct-Mar", "tip": "Experience houseboat stays, try local cuisine, follow temple etiquette"},
-        "rajasthan": {"best_time": "Oct-Mar", "tip": "Stay hydrated, bargain in local markets, consider heritage hotels"},
-        "himachal pradesh": {"best_time": "Apr-Jun", "tip": "Carry warm clothes, book accommodations in advance, follow mountain safety"}
-    }
-    
-    dest_tips = tips.get(final_destination.lower(), {"best_time": "Research climate", "tip": "Respect local culture and customs"})
+    dest_tips = DESTINATION_TIPS.get(final_destination.lower(), _DEFAULT_TIPS)
     
     result = f"""💡 **Travel Tips for {final_destination.title()}**
 
@@ -383,25 +476,30 @@ def AlertsTool(destination: str) -> str:
 # SOS Tools remain the same
 _sos_system = SOSSystem()
 
+# pywhatkit sends are already moved to worker threads; Cloud API sends reuse
+# the pooled session of whichever loop runs the tool
+@_sync_entry
 @tool
-def SOSAddContactTool(user_id: str, name: str, number: str, relation: str = "family") -> str:
+async def SOSAddContactTool(user_id: str, name: str, number: str, relation: str = "family") -> str:
     """Add emergency contact for user to MongoDB."""
     import tools.sos as sos_mod
     contact_data = {"name": name, "number": number, "relation": relation}
-    return asyncio.run(sos_mod.add_single_contact(user_id, contact_data))
+    return await sos_mod.add_single_contact(user_id, contact_data)
 
+@_sync_entry
 @tool
-def SOSListContactsTool(user_id: str) -> str:
+async def SOSListContactsTool(user_id: str) -> str:
     """List all emergency contacts for user from MongoDB."""
     import tools.sos as sos_mod
-    return asyncio.run(sos_mod.list_contacts(user_id))
+    return await sos_mod.list_contacts(user_id)
 
+@_sync_entry
 @tool
-def SOSTriggerTool(user_id: str, user_location: str = "", user_message: str = "") -> str:
+async def SOSTriggerTool(user_id: str, user_location: str = "", user_message: str = "") -> str:
     """Trigger SOS alert to all saved contacts via WhatsApp."""
-    return asyncio.run(_sos_system.trigger_sos(
+    return await _sos_system.trigger_sos(
         user_location or None, user_message or None, user_id=user_id
-    ))
+    )
 
 # All tools
 tools = [
@@ -410,47 +508,121 @@ tools = [
     SOSAddContactTool, SOSListContactsTool, SOSTriggerTool
 ]
 tool_node = ToolNode(tools=tools)
+# Tool schemas are converted once, not on every chatbot turn
+_LLM_WITH_TOOLS = llm.bind_tools(tools)
 
 # ----------------------------
 # Agent logic
 # ----------------------------
+# Frontend sends "[LIVE_LOCATION] lat=<lat> lon=<lon> <message>"
+_LATLON_RE = re.compile(r"lat=(?P<lat>[-0-9.]+).*?lon=(?P<lon>[-0-9.]+)")
+# Query classifier: one scan finds every kind of request the query mentions
+_QUERY_KIND_RE = re.compile(
+    r"(?P<places>places to visit)|(?P<images>show images|images of)"
+    r"|(?P<plan>plan)|(?P<trip>budget for|itinerary)|(?P<weather>weather)"
+)
+# Words skipped when picking the location out of a trip-planning query
+_QUERY_STOPWORDS = frozenset({'plan', 'trip', 'days', 'visit', 'travel', 'tour', 'with', 'family', 'friends', 'budget', 'for'})
+# Image lookups in flight at once per trip-planning turn
+IMAGE_FANOUT = 5
+# Place names are bolded in get_places output
+_BOLD_NAME_RE = re.compile(r'\*\*([^*]+)\*\*')
+_DAYS_RE = re.compile(r'(\d+)\s*days?')
+
 def _extract_live_location_hint(messages: List[BaseMessage]) -> Optional[Tuple[float, float]]:
     """Extract coordinates from live location hint message."""
     for msg in reversed(messages):
         if (isinstance(msg, HumanMessage) and isinstance(msg.content, str) and 
             msg.content.startswith("[LIVE_LOCATION]")):
-            mlat = re.search(r"lat=([\-0-9\.]+)", msg.content)
-            mlon = re.search(r"lon=([\-0-9\.]+)", msg.content)
-            if mlat and mlon:
-                return float(mlat.group(1)), float(mlon.group(1))
+            m = _LATLON_RE.search(msg.content)
+            if m:
+                return float(m["lat"]), float(m["lon"])
     return None
 
 
-def chatbot(state: State):
+async def _trip_fanout(location: str, user_query_lower: str, is_trip_planning: bool) -> str:
+    """Extra tool context for places / trip-planning answers, fetched concurrently.
+
+    Places come first (their names drive the image lookups); the news lookup
+    starts alongside them, and all image lookups run at once afterwards.
+    """
+    news_task = asyncio.create_task(get_news(location)) if is_trip_planning else None
+    try:
+        try:
+            places_result = await get_places(location, "tourism")
+        except Exception:
+            # Fallback to basic image call
+            try:
+                return f"\n\nImagesTool: {await get_images(location)}"
+            except Exception:
+                return ""
+        parts = [f"\n\nPlacesTool: {places_result}"]
+
+        # Images for the first 5 places, plus the safest waterfall when planning
+        place_names = _BOLD_NAME_RE.findall(places_result)[:5]
+        waterfall = get_safest_waterfall(location) if is_trip_planning else None
+        queries = [name.strip() for name in place_names] + ([waterfall["name"]] if waterfall else [])
+        sem = asyncio.Semaphore(IMAGE_FANOUT)
+
+        async def one_image(query):
+            async with sem:
+                return await get_images(query)
+
+        images = await asyncio.gather(*(one_image(q) for q in queries), return_exceptions=True)
+        for place_name, place_images in zip(place_names, images):
+            if not isinstance(place_images, BaseException):
+                parts.append(f"\n\nImagesTool({place_name}): {place_images}")
+
+        if waterfall:
+            parts.append(f"\n\nSafestWaterfall: {waterfall_safety_text(waterfall)}")
+            if not isinstance(images[-1], BaseException):
+                parts.append(f"\n\nImagesTool({waterfall['name']}): {images[-1]}")
+
+            # News for safety verification
+            try:
+                parts.append(f"\n\nNewsTool: {await news_task}")
+            except Exception:
+                pass
+
+            # Budget if mentioned
+            if 'budget' in user_query_lower:
+                days_match = _DAYS_RE.search(user_query_lower)
+                days = int(days_match.group(1)) if days_match else 3
+                
+                budget_result = f"💰 **Budget for {days}-day {location} trip:**\n\n**Mid-range Category:**\n🏨 Accommodation: ₹2,500 per day\n🍛 Food: ₹1,200 per day\n🚗 Transport: ₹800 per day\n🎫 Activities: ₹1,000 per day\n\n**Total per day: ₹5,500**\n**{days}-day trip total: ₹{5500 * days:,}**"
+                parts.append(f"\n\nBudgetTool: {budget_result}")
+        return "".join(parts)
+    finally:
+        if news_task:
+            news_task.cancel()
+
+async def chatbot(state: State):
     """ReAct architecture chatbot with trip planning psychology."""
     messages = state["messages"]
     last_message = messages[-1] if messages else None
 
     # Check if last message is from tools - create final response with psychology
     if hasattr(last_message, 'type') and last_message.type == 'tool':
-        # Collect all recent tool results
+        # One backwards pass: tool results back to the AI turn that requested
+        # them, and the most recent user query
         tool_results = []
-        user_query = ""
-        
-        # Find the original user query
+        user_query = None
+        collecting = True
         for msg in reversed(messages):
-            if hasattr(msg, 'type') and msg.type == 'human':
+            msg_type = getattr(msg, 'type', None)
+            if collecting:
+                if msg_type == 'tool':
+                    tool_name = getattr(msg, 'name', 'Tool')
+                    tool_content = getattr(msg, 'content', 'No content')
+                    tool_results.append(f"{tool_name}: {tool_content}")
+                    continue
+                if msg_type == 'ai' and hasattr(msg, 'tool_calls'):
+                    collecting = False
+            if msg_type == 'human' and user_query is None:
                 user_query = msg.content
+            if user_query is not None and not collecting:
                 break
-        
-        # Collect tool results
-        for msg in reversed(messages):
-            if hasattr(msg, 'type') and msg.type == 'tool':
-                tool_name = getattr(msg, 'name', 'Tool')
-                tool_content = getattr(msg, 'content', 'No content')
-                tool_results.append(f"{tool_name}: {tool_content}")
-            elif hasattr(msg, 'type') and msg.type == 'ai' and hasattr(msg, 'tool_calls'):
-                break
+        user_query = user_query or ""
         
         # Create psychology-aware response
         if tool_results:
@@ -459,71 +631,23 @@ def chatbot(state: State):
             # Detect query type
             user_query_lower = user_query.lower().strip()
             
-            is_places_query = 'places to visit' in user_query_lower
-            is_weather_query = 'weather' in user_query_lower and 'plan' not in user_query_lower
-            is_images_query = 'show images' in user_query_lower or 'images of' in user_query_lower
-            is_trip_planning = any(word in user_query_lower for word in ['plan', 'budget for', 'itinerary'])
+            kinds = {m.lastgroup for m in _QUERY_KIND_RE.finditer(user_query_lower)}
+            is_places_query = 'places' in kinds
+            is_weather_query = 'weather' in kinds and 'plan' not in kinds
+            is_images_query = 'images' in kinds
+            is_trip_planning = 'plan' in kinds or 'trip' in kinds
             
             # Enhanced image calling for individual places
             if is_places_query or is_trip_planning:
                 # Extract location from user query
-                location_match = None
-                words = user_query.split()
-                for word in words:
-                    if len(word) > 3 and word.lower() not in ['plan', 'trip', 'days', 'visit', 'travel', 'tour', 'with', 'family', 'friends', 'budget', 'for']:
-                        location_match = word.strip('.,!?')
-                        break
+                location_match = next(
+                    (word.strip('.,!?') for word in user_query.split()
+                     if len(word) > 3 and word.lower() not in _QUERY_STOPWORDS),
+                    None,
+                )
                 
                 if location_match:
-                    try:
-                        # Get places first
-                        places_result = asyncio.run(get_places(location_match, "tourism"))
-                        combined_results += f"\n\nPlacesTool: {places_result}"
-                        
-                        # Extract individual place names from places result and get images for each
-                        import re
-                        place_names = re.findall(r'\*\*([^*]+)\*\*', places_result)
-                        
-                        for place_name in place_names[:5]:  # Limit to first 5 places
-                            try:
-                                place_images = asyncio.run(get_images(place_name.strip()))
-                                combined_results += f"\n\nImagesTool({place_name}): {place_images}"
-                            except:
-                                pass
-                                
-                        # For trip planning, get safest waterfall and safety verification
-                        if is_trip_planning:
-                            try:
-                                # Get safest waterfall for the location
-                                safest_waterfall = get_safest_waterfall(location_match)
-                                waterfall_info = format_waterfall_safety(safest_waterfall)
-                                combined_results += f"\n\nSafestWaterfall: {waterfall_info}"
-                                
-                                # Get waterfall images
-                                waterfall_images = asyncio.run(get_images(safest_waterfall['name']))
-                                combined_results += f"\n\nImagesTool({safest_waterfall['name']}): {waterfall_images}"
-                                
-                                # Get news for safety verification
-                                news_result = asyncio.run(get_news(location_match))
-                                combined_results += f"\n\nNewsTool: {news_result}"
-                                
-                                # Get budget if mentioned
-                                if 'budget' in user_query_lower:
-                                    days_match = re.search(r'(\d+)\s*days?', user_query_lower)
-                                    days = int(days_match.group(1)) if days_match else 3
-                                    
-                                    budget_result = f"💰 **Budget for {days}-day {location_match} trip:**\n\n**Mid-range Category:**\n🏨 Accommodation: ₹2,500 per day\n🍛 Food: ₹1,200 per day\n🚗 Transport: ₹800 per day\n🎫 Activities: ₹1,000 per day\n\n**Total per day: ₹5,500**\n**{days}-day trip total: ₹{5500 * days:,}**"
-                                    combined_results += f"\n\nBudgetTool: {budget_result}"
-                            except:
-                                pass
-                                
-                    except Exception as e:
-                        # Fallback to basic image call
-                        try:
-                            image_result = asyncio.run(get_images(location_match))
-                            combined_results += f"\n\nImagesTool: {image_result}"
-                        except:
-                            pass
+                    combined_results += await _trip_fanout(location_match, user_query_lower, is_trip_planning)
             
             # Create appropriate response based on query type
             if is_places_query:
@@ -537,7 +661,7 @@ def chatbot(state: State):
             else:
                 final_prompt = f"User asked: {user_query}\n\nTool results: {combined_results}\n\nProvide helpful travel information based on the query."
             
-            final_response = llm.invoke([SystemMessage(content=get_trip_agent_prompt())] + [HumanMessage(content=final_prompt)])
+            final_response = await llm.ainvoke([_SYS_MSG, HumanMessage(content=final_prompt)])
             return {"messages": [final_response]}
 
     # Handle "near me" queries with live location
@@ -546,12 +670,12 @@ def chatbot(state: State):
             hint = _extract_live_location_hint(messages)
             if hint:
                 lat, lon = hint
-                resolved_location = asyncio.run(reverse_geocode(lat, lon)) or f"{lat},{lon}"
-                messages.append(HumanMessage(content=f"[INFO] Using your current location: {resolved_location}"))
+                resolved_location = await reverse_geocode(lat, lon) or f"{lat},{lon}"
+                # Only for this LLM call; the graph state is left untouched
+                messages = messages + [HumanMessage(content=f"[INFO] Using your current location: {resolved_location}")]
 
     # Normal LLM processing with tools
-    llm_with_tools = llm.bind_tools(tools)
-    response = llm_with_tools.invoke([SystemMessage(content=get_trip_agent_prompt())] + messages)
+    response = await _LLM_WITH_TOOLS.ainvoke([_SYS_MSG] + messages)
     return {"messages": [response]}
 
 def should_continue(state: State):